@@ -6,6 +6,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from .models import UserProfile, OTPVerification
+from students.ratelimit import get_email_rate_limiter
 import re
 
 
@@ -183,6 +184,7 @@ class ForgotPasswordSerializer(serializers.Serializer):
         """
         
         try:
+            get_email_rate_limiter().acquire()
             send_mail(
                 subject,
                 message,
@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import timedelta
 from decouple import config
+import os
+import tempfile
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -187,6 +189,80 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('GMAIL_USER')
 EMAIL_HOST_PASSWORD = config('GMAIL_APP_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
+# Seconds before a blocked SMTP socket operation fails, so a hung server cannot stall a send forever
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
+
+# Outgoing email rate limit (token bucket shared by all processes through the database).
+# Gmail publishes daily sending caps per account rather than a per-second SMTP rate, and enforces
+# those itself; the default paces sends fast enough for 5,000 notices in under 5 minutes (~17/s).
+# Lower it if the account's provider throttles below that.
+EMAIL_RATE_LIMIT_PER_SECOND = config('EMAIL_RATE_LIMIT_PER_SECOND', default=20.0, cast=float)
+EMAIL_RATE_LIMIT_BURST = config('EMAIL_RATE_LIMIT_BURST', default=20, cast=int)
+
+# Number of parallel SMTP connections used by bulk sends (1 sends serially)
+EMAIL_SEND_WORKERS = config('EMAIL_SEND_WORKERS', default=4, cast=int)
+
+# Successful sends are flagged email_sent in batches of this size, or at least this often (seconds)
+EMAIL_STATUS_BATCH_SIZE = config('EMAIL_STATUS_BATCH_SIZE', default=100, cast=int)
+EMAIL_STATUS_FLUSH_INTERVAL = config('EMAIL_STATUS_FLUSH_INTERVAL', default=5.0, cast=float)
+
+# Transient SMTP failures are retried with jittered exponential backoff (seconds) before dead-lettering
+EMAIL_RETRY_MAX_ATTEMPTS = config('EMAIL_RETRY_MAX_ATTEMPTS', default=5, cast=int)
+EMAIL_RETRY_BASE_DELAY = config('EMAIL_RETRY_BASE_DELAY', default=30.0, cast=float)
+EMAIL_RETRY_MAX_DELAY = config('EMAIL_RETRY_MAX_DELAY', default=3600.0, cast=float)
+
+# Email jobs checkpoint their cursor after every chunk of this many students
+EMAIL_JOB_CHUNK_SIZE = config('EMAIL_JOB_CHUNK_SIZE', default=500, cast=int)
+
+# Running jobs touch heartbeat_at this often from a background thread, whatever their sends are doing;
+# keep it well below run_email_worker --stale-after (600s by default)
+EMAIL_JOB_HEARTBEAT_INTERVAL = config('EMAIL_JOB_HEARTBEAT_INTERVAL', default=30.0, cast=float)
+
+# A job whose run fails part way is requeued (with retry backoff) to resume from its cursor this many times
+EMAIL_JOB_MAX_RESUMES = config('EMAIL_JOB_MAX_RESUMES', default=3, cast=int)
+
+# Job progress streams end with a 'timeout' event after this many seconds; clients reconnect to keep following
+EMAIL_PROGRESS_STREAM_MAX_SECONDS = config('EMAIL_PROGRESS_STREAM_MAX_SECONDS', default=300.0, cast=float)
+
+# Uploads are always spooled to a temp file on disk and parsed from there (memory-mapped for CSV),
+# so request handlers never hold a whole seating file in memory
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Exam room uploads are applied this many rows at a time, each chunk in its own transaction
+UPLOAD_APPLY_CHUNK_SIZE = config('UPLOAD_APPLY_CHUNK_SIZE', default=500, cast=int)
+
+# Streaming uploads read this many CSV rows per chunk and report at most this many errors/unknown roll numbers
+UPLOAD_STREAM_CHUNK_SIZE = config('UPLOAD_STREAM_CHUNK_SIZE', default=20000, cast=int)
+UPLOAD_MAX_REPORTED_ERRORS = config('UPLOAD_MAX_REPORTED_ERRORS', default=1000, cast=int)
+
+# Processes used to parse the files/sheets of a zip or multi-sheet upload in parallel
+UPLOAD_PARSE_WORKERS = config('UPLOAD_PARSE_WORKERS', default=os.cpu_count() or 1, cast=int)
+
+# Smaller uploads are parsed serially: each spawned worker re-imports Django and pandas, a few seconds of
+# start-up that only pays off once the parts take longer than that to parse (~10 MB of zipped CSV or xlsx)
+UPLOAD_PARSE_POOL_MIN_BYTES = config('UPLOAD_PARSE_POOL_MIN_BYTES', default=10 * 1024 * 1024, cast=int)
+
+# Excel reader for uploads: 'calamine' (if installed), 'openpyxl' (read-only streaming) or 'pandas'
+UPLOAD_EXCEL_ENGINE = config('UPLOAD_EXCEL_ENGINE', default='calamine')
+
+# Upload previews are cached on disk so any worker process can commit them, for this many seconds
+UPLOAD_PREVIEW_TTL = config('UPLOAD_PREVIEW_TTL', default=900, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'uploads': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config(
+            'UPLOAD_PREVIEW_CACHE_DIR',
+            default=str(Path(tempfile.gettempdir()) / 'smartboard-upload-previews')
+        ),
+        'TIMEOUT': UPLOAD_PREVIEW_TTL,
+    },
+}
 
 # For development, you can also use console backend to test
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
\ No newline at end of file
@@ -4,9 +4,25 @@ from django.db import models
 from django.utils.html import format_html
 from django.contrib.admin import SimpleListFilter
 from django.db.models import Count, Q
-from .models import Student
+from .models import Student, EmailJob, EmailTemplate, EmailDelivery, EmailDeadLetter, ExamRoomUpload, Room, StudentStats
+from .querysets import iter_keyset
+from .statistics import bulk_stats_refresh, refresh_student_stats, student_groups
 import csv
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+
+
+# Columns read for the CSV export; nothing else is loaded per row
+EXPORT_FIELDS = (
+    'roll_number', 'name', 'branch', 'year', 'gmail_address',
+    'phone_number', 'exam_hall_number', 'email_sent', 'created_at'
+)
+
+
+class Echo:
+    """File-like object that hands each written CSV line straight back"""
+
+    def write(self, value):
+        return value
 
 
 class BranchFilter(SimpleListFilter):
@@ -105,6 +121,11 @@ class StudentAdmin(admin.ModelAdmin):
         'clear_exam_halls', 'send_bulk_emails'
     ]
     
+    def delete_queryset(self, request, queryset):
+        """Delete selected students, refreshing their dashboard statistics once rather than per row"""
+        with bulk_stats_refresh(queryset):
+            super().delete_queryset(request, queryset)
+    
     # Custom display methods
     def branch_display(self, obj):
         return obj.get_branch_display()
@@ -135,42 +156,48 @@ class StudentAdmin(admin.ModelAdmin):
     
     # Custom actions
     def export_to_csv(self, request, queryset):
-        """Export selected students to CSV"""
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="students_export.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Roll Number', 'Name', 'Branch', 'Year', 'Gmail Address', 
-            'Phone Number', 'Exam Hall Number', 'Email Sent', 'Created At'
-        ])
-        
-        for student in queryset:
-            writer.writerow([
-                student.roll_number, student.name, student.get_branch_display(),
-                student.get_year_display(), student.gmail_address or '',
-                student.phone_number or '', student.exam_hall_number or '',
-                'Yes' if student.email_sent else 'No', student.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        """Export selected students to CSV, streamed in roster order"""
+        writer = csv.writer(Echo())
+
+        def rows():
+            yield writer.writerow([
+                'Roll Number', 'Name', 'Branch', 'Year', 'Gmail Address', 
+                'Phone Number', 'Exam Hall Number', 'Email Sent', 'Created At'
             ])
-        
+            for student in iter_keyset(queryset, fields=EXPORT_FIELDS):
+                yield writer.writerow([
+                    student.roll_number, student.name, student.get_branch_display(),
+                    student.get_year_display(), student.gmail_address or '',
+                    student.phone_number or '', student.exam_hall_number or '',
+                    'Yes' if student.email_sent else 'No', student.created_at.strftime('%Y-%m-%d %H:%M:%S')
+                ])
+
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="students_export.csv"'
         return response
     export_to_csv.short_description = "Export selected students to CSV"
     
     def mark_email_sent(self, request, queryset):
         """Mark selected students as email sent"""
+        groups = student_groups(queryset)
         count = queryset.update(email_sent=True)
+        refresh_student_stats(groups)
         self.message_user(request, f'{count} students marked as email sent.')
     mark_email_sent.short_description = "Mark selected students as email sent"
     
     def mark_email_pending(self, request, queryset):
         """Mark selected students as email pending"""
+        groups = student_groups(queryset)
         count = queryset.update(email_sent=False)
+        refresh_student_stats(groups)
         self.message_user(request, f'{count} students marked as email pending.')
     mark_email_pending.short_description = "Mark selected students as email pending"
     
     def clear_exam_halls(self, request, queryset):
         """Clear exam hall numbers for selected students"""
+        groups = student_groups(queryset)
         count = queryset.update(exam_hall_number=None)
+        refresh_student_stats(groups)
         self.message_user(request, f'Exam hall numbers cleared for {count} students.')
     clear_exam_halls.short_description = "Clear exam hall numbers for selected students"
     
@@ -189,20 +216,18 @@ class StudentAdmin(admin.ModelAdmin):
             self.message_user(request, 'No valid students found (must have Gmail address and exam hall number).', level='WARNING')
             return
         
-        # Import the email function from views
-        from .views import send_bulk_emails
+        # Import the job queue helper
+        from .jobs import enqueue_email_job
         
         try:
-            email_results = send_bulk_emails(valid_students)
-            successful_emails = len([r for r in email_results if r['success']])
-            failed_emails = len([r for r in email_results if not r['success']])
+            email_job = enqueue_email_job(EmailJob.KIND_ADMIN, valid_students, request.user)
             
             self.message_user(
                 request, 
-                f'Bulk email completed: {successful_emails} sent successfully, {failed_emails} failed.'
+                f'Bulk email queued as job #{email_job.id} for {email_job.total_count} students.'
             )
         except Exception as e:
-            self.message_user(request, f'Error sending bulk emails: {str(e)}', level='ERROR')
+            self.message_user(request, f'Error queueing bulk emails: {str(e)}', level='ERROR')
     
     send_bulk_emails.short_description = "Send emails to selected students"
     
@@ -238,6 +263,107 @@ class StudentAdmin(admin.ModelAdmin):
         return super().changelist_view(request, extra_context=extra_context)
 
 
+@admin.register(EmailJob)
+class EmailJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'kind', 'status', 'attempt', 'total_count', 'sent_count', 'failed_count',
+        'created_by', 'created_at', 'run_after', 'finished_at'
+    ]
+    list_filter = ['kind', 'status', 'created_at']
+    readonly_fields = [
+        'kind', 'status', 'total_count', 'sent_count', 'failed_count', 'results',
+        'error', 'attempt', 'run_after', 'parent', 'created_by', 'created_at',
+        'started_at', 'finished_at'
+    ]
+    exclude = ['recipients']
+
+
+@admin.register(EmailTemplate)
+class EmailTemplateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'subject', 'is_active', 'version', 'updated_at']
+    list_filter = ['is_active']
+    readonly_fields = ['version', 'updated_at']
+    
+    def get_changeform_initial_data(self, request):
+        """Pre-fill new templates with the built-in exam notice"""
+        from .email_templates import (
+            EXAM_NOTICE_TEMPLATE, DEFAULT_SUBJECT, DEFAULT_TEXT_BODY, DEFAULT_HTML_BODY
+        )
+        
+        initial = super().get_changeform_initial_data(request)
+        initial.setdefault('name', EXAM_NOTICE_TEMPLATE)
+        initial.setdefault('subject', DEFAULT_SUBJECT)
+        initial.setdefault('text_body', DEFAULT_TEXT_BODY)
+        initial.setdefault('html_body', DEFAULT_HTML_BODY)
+        return initial
+
+
+@admin.register(EmailDelivery)
+class EmailDeliveryAdmin(admin.ModelAdmin):
+    list_display = [
+        'student', 'exam_hall_number', 'email', 'send_count', 'first_sent_at', 'last_sent_at'
+    ]
+    list_filter = ['last_sent_at']
+    search_fields = ['student__roll_number', 'email', 'exam_hall_number']
+    readonly_fields = [
+        'student', 'content_hash', 'exam_hall_number', 'email', 'send_count',
+        'first_sent_at', 'last_sent_at'
+    ]
+    list_select_related = ['student']
+
+
+@admin.register(EmailDeadLetter)
+class EmailDeadLetterAdmin(admin.ModelAdmin):
+    list_display = [
+        'student', 'email', 'error_class', 'error_code', 'attempts', 'created_at'
+    ]
+    list_filter = ['error_class', 'error_code', 'created_at']
+    search_fields = ['student__roll_number', 'email', 'error_message']
+    readonly_fields = [
+        'student', 'job', 'email', 'exam_hall_number', 'error_class', 'error_code',
+        'error_message', 'attempts', 'created_at'
+    ]
+    list_select_related = ['student']
+
+
+@admin.register(ExamRoomUpload)
+class ExamRoomUploadAdmin(admin.ModelAdmin):
+    list_display = [
+        'file_name', 'added_count', 'changed_count', 'unchanged_count',
+        'not_found_count', 'error_count', 'uploaded_by', 'created_at'
+    ]
+    list_filter = ['created_at']
+    search_fields = ['file_name', 'content_hash']
+    readonly_fields = [
+        'content_hash', 'file_name', 'file_size', 'added_count', 'changed_count', 'unchanged_count',
+        'not_found_count', 'error_count', 'email_job', 'uploaded_by', 'created_at'
+    ]
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ['number', 'capacity', 'position', 'is_active', 'created_at']
+    list_editable = ['capacity', 'position', 'is_active']
+    list_filter = ['is_active']
+    search_fields = ['number']
+
+
+@admin.register(StudentStats)
+class StudentStatsAdmin(admin.ModelAdmin):
+    list_display = [
+        'branch', 'year', 'count', 'emails_sent', 'with_room', 'with_gmail',
+        'ready_for_email', 'missing_gmail', 'missing_room', 'updated_at'
+    ]
+    list_filter = ['branch', 'year']
+    readonly_fields = [
+        'branch', 'year', 'count', 'emails_sent', 'with_room', 'with_gmail',
+        'ready_for_email', 'missing_gmail', 'missing_room', 'updated_at'
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+
 # Custom admin site configuration (optional)
 admin.site.site_header = 'MITS Student Management System'
 admin.site.site_title = 'MITS Admin'
@@ -0,0 +1,104 @@
+# students/allocation.py
+from django.db import transaction
+from django.db.models import Count
+from .models import Student, Room
+from .querysets import STUDENT_KEYSET
+from .statistics import refresh_student_stats, student_groups
+from itertools import chain, zip_longest
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ids per UPDATE ... WHERE id IN (...), within SQLite's 999 parameter limit
+UPDATE_BATCH_SIZE = 500
+
+
+def interleave_branches(rows):
+    """Alternate branches seat by seat, keeping (year, roll_number) order within each branch"""
+    by_branch = {}
+    for row in rows:
+        by_branch.setdefault(row[1], []).append(row)
+    return [row for row in chain.from_iterable(zip_longest(*by_branch.values())) if row is not None]
+
+
+def allocate_exam_halls(students, rooms=None, interleave=False, dry_run=False):
+    """Seat students in rooms in (branch, year, roll_number) order, filling each room to capacity.
+
+    `students` is a Student queryset and `rooms` an optional Room queryset
+    (all active rooms by default). Seats already taken by students outside
+    the selection are left alone, so allocating one filtered group after
+    another never overfills a room. Only (id, branch, hall) tuples are loaded,
+    and the assignments are written with one UPDATE per room and batch of
+    ids inside a single transaction, skipping students already seated in the
+    right room. Returns the allocation summary and the ids of students whose
+    hall changed.
+    """
+    if rooms is None:
+        rooms = Room.objects.filter(is_active=True)
+    # One grouped query for the seats held by students outside this selection
+    occupied = dict(
+        Student.objects.filter(exam_hall_number__in=rooms.values('number')).exclude(
+            id__in=students.order_by().values('id')
+        ).values('exam_hall_number').annotate(count=Count('id')).values_list('exam_hall_number', 'count')
+    )
+    rooms = list(rooms.values_list('number', 'capacity'))
+
+    rows = list(students.order_by(*STUDENT_KEYSET).values_list('id', 'branch', 'exam_hall_number'))
+    if interleave:
+        rows = interleave_branches(rows)
+
+    free = {number: max(capacity - occupied.get(number, 0), 0) for number, capacity in rooms}
+    seats = sum(free.values())
+    if len(rows) > seats:
+        raise ValueError(
+            f"Not enough seats: {len(rows)} students selected but the rooms have {seats} free"
+        )
+
+    occupancy = []
+    moves = {}
+    position = 0
+    for number, capacity in rooms:
+        if position >= len(rows):
+            break
+        # Rooms with no free seats are skipped rather than ending the allocation
+        if not free[number]:
+            continue
+        seated = rows[position:position + free[number]]
+        position += len(seated)
+        occupancy.append({
+            'room': number,
+            'capacity': capacity,
+            'occupied': occupied.get(number, 0),
+            'allocated': len(seated)
+        })
+
+        changed = [student_id for student_id, _, hall in seated if hall != number]
+        if changed:
+            moves[number] = changed
+
+    changed_ids = list(chain.from_iterable(moves.values()))
+
+    if not dry_run:
+        with transaction.atomic():
+            for number, student_ids in moves.items():
+                for start in range(0, len(student_ids), UPDATE_BATCH_SIZE):
+                    Student.objects.filter(
+                        id__in=student_ids[start:start + UPDATE_BATCH_SIZE]
+                    ).update(exam_hall_number=number)
+            if moves:
+                refresh_student_stats(student_groups(students))
+
+        logger.info(
+            f"Allocated {len(rows)} students to {len(occupancy)} rooms "
+            f"({len(changed_ids)} changed hall)"
+        )
+
+    summary = {
+        'allocated_count': len(rows),
+        'changed_count': len(changed_ids),
+        'unchanged_count': len(rows) - len(changed_ids),
+        'rooms_used': len(occupancy),
+        'seats_available': seats,
+        'rooms': occupancy,
+    }
+    return summary, changed_ids
@@ -0,0 +1,265 @@
+# students/benchmarks.py
+"""Shared helpers for the bench_* management commands.
+
+Benchmarks run against a throwaway copy of the database and, for email
+paths, a local fake SMTP server, so they never touch real data or Gmail.
+"""
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from .models import Student
+from .statistics import reconcile_student_stats
+import json
+import math
+import os
+import random
+import socketserver
+import subprocess
+import tempfile
+import threading
+import time
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None for an empty list)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def git_commit():
+    """Current commit hash so results can be compared across commits"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, name, config, results):
+    """Write a benchmark run as JSON and return the payload"""
+    payload = {
+        'benchmark': name,
+        'commit': git_commit(),
+        'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+        'config': config,
+        'results': results,
+    }
+    if path:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2)
+    return payload
+
+
+@contextmanager
+def benchmark_database():
+    """Run the block against a freshly migrated, file-backed throwaway database"""
+    workdir = tempfile.mkdtemp(prefix='smartboard-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    original_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = original_name
+        try:
+            os.rmdir(workdir)
+        except OSError:
+            pass
+
+
+def seed_students(count, with_hall=True):
+    """Create `count` students spread over every branch and year"""
+    branches = [code for code, _ in Student.BRANCH_CHOICES]
+    years = [code for code, _ in Student.YEAR_CHOICES]
+
+    Student.objects.bulk_create(
+        [
+            Student(
+                name=f'Bench Student {i}',
+                roll_number=f'BENCH{i:06d}',
+                branch=branches[i % len(branches)],
+                year=years[(i // len(branches)) % len(years)],
+                gmail_address=f'bench{i}@gmail.com',
+                exam_hall_number=str(100 + i % 300) if with_hall else None
+            )
+            for i in range(count)
+        ],
+        batch_size=1000
+    )
+    reconcile_student_stats()
+
+
+class DatabaseWriteCounter:
+    """Counts SQL statements on every thread's connection while active"""
+
+    WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self):
+        self.queries = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._wrapped = []
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.queries += 1
+            if sql.lstrip().upper().startswith(self.WRITE_PREFIXES):
+                self.writes += 1
+        return execute(sql, params, many, context)
+
+    def _install(self, conn):
+        conn.execute_wrappers.append(self)
+        self._wrapped.append(conn)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            self._install(connection)
+
+    def __enter__(self):
+        for conn in connections.all():
+            self._install(conn)
+        connection_created.connect(self._on_connection_created)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection_created.disconnect(self._on_connection_created)
+        for conn in self._wrapped:
+            if self in conn.execute_wrappers:
+                conn.execute_wrappers.remove(self)
+        self._wrapped = []
+
+
+class _FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's backend: no TLS, no AUTH"""
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        started = None
+        refused = False
+        self.reply('220 fake-smtp ready')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.strip().split(b' ', 1)[0].upper()
+
+            if command == b'EHLO':
+                self.wfile.write(b'250-fake-smtp\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n')
+            elif command == b'HELO':
+                self.reply('250 fake-smtp')
+            elif command == b'MAIL':
+                if server.roll(server.disconnect_rate):
+                    return  # Drop the connection mid-session
+                started = time.perf_counter()
+                refused = False
+                self.reply('250 OK')
+            elif command == b'RCPT':
+                if server.roll(server.permanent_failure_rate):
+                    refused = True
+                    server.count('permanent_failures')
+                    self.reply('550 5.1.1 No such user')
+                elif server.roll(server.transient_failure_rate):
+                    refused = True
+                    server.count('transient_failures')
+                    self.reply('451 4.3.0 Try again later')
+                else:
+                    self.reply('250 OK')
+            elif command == b'DATA':
+                if refused:
+                    self.reply('503 No valid recipients')
+                    continue
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b'.\r\n':
+                        break
+                if server.latency:
+                    time.sleep(server.latency)
+                server.record_delivery(time.perf_counter() - started)
+                self.reply('250 OK queued')
+            elif command in (b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """In-process SMTP sink with configurable latency and failure injection"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0, transient_failure_rate=0.0, permanent_failure_rate=0.0,
+                 disconnect_rate=0.0, seed=None):
+        super().__init__(('127.0.0.1', 0), _FakeSMTPHandler)
+        self.latency = latency
+        self.transient_failure_rate = transient_failure_rate
+        self.permanent_failure_rate = permanent_failure_rate
+        self.disconnect_rate = disconnect_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def roll(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def record_delivery(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def reset_stats(self):
+        with self._lock:
+            self.latencies = []
+            self.stats = {'transient_failures': 0, 'permanent_failures': 0}
+
+    def email_settings(self):
+        """Settings overrides that point Django's SMTP backend at this server"""
+        return {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': self.port,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_USE_SSL': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+            'EMAIL_TIMEOUT': 30,
+        }
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,165 @@
+# students/email_templates.py
+from django.template import Context, Engine
+from .models import Student, EmailTemplate
+import hashlib
+import threading
+
+EXAM_NOTICE_TEMPLATE = 'exam_room'
+
+DEFAULT_SUBJECT = 'Exam Room Allocation - {{ roll_number }} | MITS'
+
+DEFAULT_TEXT_BODY = """Dear {{ name }},
+
+Your exam room has been allocated for the upcoming examination.
+
+📚 STUDENT DETAILS:
+━━━━━━━━━━━━━━━━━━━━━
+👤 Name: {{ name }}
+🎓 Roll Number: {{ roll_number }}
+🏛️ Branch: {{ branch_display }}
+📅 Year: {{ year_display }}
+🏢 Exam Hall Number: {{ exam_hall_number }}
+📧 Contact Email: {{ gmail_address }}
+
+⚠️ IMPORTANT INSTRUCTIONS:
+━━━━━━━━━━━━━━━━━━━━━━━━
+• Please arrive at the exam hall at least 30 minutes before the scheduled exam time
+• Bring your valid student ID card and hall ticket
+• Mobile phones and electronic devices are strictly prohibited in the exam hall
+• Reach the venue early to avoid any last-minute rush
+
+📍 Exam Hall Location: Hall Number {{ exam_hall_number }}
+
+For any queries, please contact the examination cell.
+
+Best regards,
+MITS Examination Cell
+Madanapalle Institute of Technology & Science
+
+---
+This is an automated message. Please do not reply to this email."""
+
+DEFAULT_HTML_BODY = """<div style="font-family: Arial, sans-serif; max-width: 600px; color: #222;">
+  <p>Dear {{ name }},</p>
+  <p>Your exam room has been allocated for the upcoming examination.</p>
+  <h3 style="border-bottom: 2px solid #1a4d8f; padding-bottom: 4px;">Student Details</h3>
+  <table cellpadding="4">
+    <tr><td><strong>Name</strong></td><td>{{ name }}</td></tr>
+    <tr><td><strong>Roll Number</strong></td><td>{{ roll_number }}</td></tr>
+    <tr><td><strong>Branch</strong></td><td>{{ branch_display }}</td></tr>
+    <tr><td><strong>Year</strong></td><td>{{ year_display }}</td></tr>
+    <tr><td><strong>Exam Hall Number</strong></td><td><strong>{{ exam_hall_number }}</strong></td></tr>
+    <tr><td><strong>Contact Email</strong></td><td>{{ gmail_address }}</td></tr>
+  </table>
+  <h3 style="border-bottom: 2px solid #1a4d8f; padding-bottom: 4px;">Important Instructions</h3>
+  <ul>
+    <li>Please arrive at the exam hall at least 30 minutes before the scheduled exam time</li>
+    <li>Bring your valid student ID card and hall ticket</li>
+    <li>Mobile phones and electronic devices are strictly prohibited in the exam hall</li>
+    <li>Reach the venue early to avoid any last-minute rush</li>
+  </ul>
+  <p>📍 Exam Hall Location: <strong>Hall Number {{ exam_hall_number }}</strong></p>
+  <p>For any queries, please contact the examination cell.</p>
+  <p>Best regards,<br>MITS Examination Cell<br>Madanapalle Institute of Technology &amp; Science</p>
+  <hr>
+  <p style="font-size: 12px; color: #777;">This is an automated message. Please do not reply to this email.</p>
+</div>"""
+
+# A private engine keeps notice rendering independent of the project's TEMPLATES setting
+_engine = Engine()
+
+_compiled_cache = {}
+_compiled_lock = threading.Lock()
+
+BRANCH_NAMES = dict(Student.BRANCH_CHOICES)
+YEAR_NAMES = dict(Student.YEAR_CHOICES)
+
+
+class CompiledNotice:
+    """An exam notice template compiled once and shared by every render"""
+
+    def __init__(self, key, subject, text_body, html_body):
+        self.key = key
+        self.subject = _engine.from_string(subject)
+        self.text_body = _engine.from_string(text_body)
+        self.html_body = _engine.from_string(html_body) if html_body else None
+        self._class_contexts = {}
+
+    def class_context(self, branch, year):
+        """Branch/year part of the context, built once per class"""
+        key = (branch, year)
+        context = self._class_contexts.get(key)
+        if context is None:
+            context = {
+                'branch': branch,
+                'branch_display': BRANCH_NAMES.get(branch, branch),
+                'year': year,
+                'year_display': YEAR_NAMES.get(year, year),
+            }
+            self._class_contexts[key] = context
+        return context
+
+    def content_hash(self, student):
+        """Fingerprint of everything that shapes this student's notice.
+
+        Hashes the template version and the student fields used by the
+        template rather than the rendered text, so the delivery ledger can be
+        checked without rendering anything.
+        """
+        parts = [
+            str(self.key),
+            student.name,
+            student.roll_number,
+            student.branch,
+            student.year,
+            student.exam_hall_number or '',
+            (student.gmail_address or '').lower(),
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def render(self, student):
+        """Render (subject, text, html) for a student; html is None for text-only templates"""
+        context = {
+            'name': student.name,
+            'roll_number': student.roll_number,
+            'exam_hall_number': student.exam_hall_number,
+            'gmail_address': student.gmail_address,
+        }
+        context.update(self.class_context(student.branch, student.year))
+
+        subject = self.subject.render(Context(context, autoescape=False)).strip()
+        text = self.text_body.render(Context(context, autoescape=False)).strip()
+        html = self.html_body.render(Context(context)) if self.html_body else None
+        return subject, text, html
+
+
+def compile_notice(key, subject, text_body, html_body):
+    """Return the compiled notice for a template version, compiling it on first use"""
+    with _compiled_lock:
+        notice = _compiled_cache.get(key)
+        if notice is None:
+            notice = CompiledNotice(key, subject, text_body, html_body)
+            _compiled_cache[key] = notice
+        return notice
+
+
+def get_exam_notice():
+    """Return the compiled exam notice for the active template version.
+
+    Costs one small query to read the active version; the template source is
+    only fetched and compiled when that version has not been seen before.
+    """
+    active = EmailTemplate.objects.filter(
+        name=EXAM_NOTICE_TEMPLATE,
+        is_active=True
+    ).values_list('id', 'version').first()
+
+    if active is None:
+        return compile_notice(('default', 0), DEFAULT_SUBJECT, DEFAULT_TEXT_BODY, DEFAULT_HTML_BODY)
+
+    key = tuple(active)
+    notice = _compiled_cache.get(key)
+    if notice is None:
+        template = EmailTemplate.objects.get(id=active[0])
+        notice = compile_notice(key, template.subject, template.text_body, template.html_body)
+    return notice
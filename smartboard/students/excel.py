@@ -0,0 +1,142 @@
+# students/excel.py
+"""Excel reading for seating and roster uploads.
+
+Only the columns an upload needs are ever loaded (S.No, Roll No and Room No
+for seating sheets). The fastest
+available engine is used: python-calamine when installed, otherwise
+openpyxl in read-only streaming mode; legacy .xls files and unknown
+engines fall back to pandas' default reader.
+"""
+from django.conf import settings
+from .uploads import upload_source
+import importlib.util
+import pandas as pd
+
+UPLOAD_COLUMNS = ('s.no', 'roll no', 'room no')
+
+ENGINES = ('calamine', 'openpyxl', 'pandas')
+
+
+def is_wanted_column(name, columns=UPLOAD_COLUMNS):
+    """Whether a header cell is one of `columns` (lower-case names, matched case insensitively)"""
+    return str(name).strip().lower() in columns
+
+
+def available_engines():
+    """Engines that can be used in this environment, fastest first"""
+    engines = []
+    if importlib.util.find_spec('python_calamine'):
+        engines.append('calamine')
+    if importlib.util.find_spec('openpyxl'):
+        engines.append('openpyxl')
+    engines.append('pandas')
+    return engines
+
+
+def select_engine(file_name, engine=None):
+    """Pick the engine for a file: the requested one if usable, else the fastest available"""
+    engine = engine or settings.UPLOAD_EXCEL_ENGINE
+    available = available_engines()
+
+    if engine in available:
+        chosen = engine
+    else:
+        chosen = available[0]
+
+    # openpyxl cannot read the old binary format
+    if chosen == 'openpyxl' and not file_name.lower().endswith('.xlsx'):
+        chosen = 'pandas'
+    return chosen
+
+
+def sheet_names(file):
+    """Names of the worksheets in an Excel upload, in workbook order"""
+    source = upload_source(file)
+    if select_engine(file.name) == 'openpyxl':
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(source, read_only=True)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+
+    with pd.ExcelFile(source) as workbook:
+        return list(workbook.sheet_names)
+
+
+def iter_excel_frames(file, chunk_size=None, engine=None, columns=UPLOAD_COLUMNS, sheet=None):
+    """Yield DataFrames of the wanted columns, `chunk_size` rows at a time.
+
+    Reads the named `sheet`, or the first one.
+    The index runs on across frames, so index + 2 is always the sheet row.
+    Only the openpyxl engine actually streams; the others read the sheet in
+    one go and yield it in slices.
+    """
+    engine = select_engine(file.name, engine)
+    # Spooled uploads are opened by path so the readers page the file from disk
+    source = upload_source(file)
+
+    if engine == 'openpyxl':
+        yield from _iter_openpyxl_frames(source, chunk_size, columns, sheet)
+        return
+
+    def usecols(name):
+        return is_wanted_column(name, columns)
+
+    sheet_name = 0 if sheet is None else sheet
+    if engine == 'calamine':
+        df = pd.read_excel(source, engine='calamine', usecols=usecols, sheet_name=sheet_name)
+    else:
+        df = pd.read_excel(source, usecols=usecols, sheet_name=sheet_name)
+
+    if not chunk_size or len(df) <= chunk_size:
+        yield df
+        return
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def read_excel(file, engine=None, columns=UPLOAD_COLUMNS, sheet=None):
+    """Read the wanted columns of a sheet (the first by default) into a single DataFrame"""
+    frames = list(iter_excel_frames(file, engine=engine, columns=columns, sheet=sheet))
+    return frames[0] if len(frames) == 1 else pd.concat(frames)
+
+
+def _cell_value(value):
+    # Match pandas: whole-number floats come back as ints
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _frame(rows, columns, start):
+    # Object columns keep each cell as read, so a blank cell never turns room 101 into 101.0
+    return pd.DataFrame(rows, columns=columns, index=range(start, start + len(rows)), dtype=object)
+
+
+def _iter_openpyxl_frames(source, chunk_size=None, columns=UPLOAD_COLUMNS, sheet=None):
+    """Stream a sheet row by row, keeping only the wanted columns"""
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0] if sheet is None else workbook[sheet]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        positions = [index for index, name in enumerate(header) if name is not None and is_wanted_column(name, columns)]
+        columns = [str(header[index]) for index in positions]
+
+        start = 0
+        batch = []
+        for row in rows:
+            batch.append([_cell_value(row[index]) if index < len(row) else None for index in positions])
+            if chunk_size and len(batch) >= chunk_size:
+                yield _frame(batch, columns, start)
+                start += len(batch)
+                batch = []
+
+        if batch or not start:
+            yield _frame(batch, columns, start)
+    finally:
+        workbook.close()
@@ -0,0 +1,265 @@
+# students/jobs.py
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from .models import EmailJob, EmailDeadLetter
+from .mailer import send_bulk_emails
+from .querysets import EMAIL_FIELDS, iter_keyset_chunks, student_key
+from datetime import timedelta
+import logging
+import random
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email_job(kind, students, user=None, attempt=1, run_after=None, parent=None):
+    """Queue an exam-room email job for the given students (or student ids) and return it"""
+    if isinstance(students, QuerySet):
+        # Stream ids from the database rather than materialising the whole selection
+        student_ids = students.order_by().values_list('id', flat=True).iterator(chunk_size=2000)
+    else:
+        student_ids = (student if isinstance(student, int) else student.id for student in students)
+
+    Recipient = EmailJob.recipients.through
+
+    with transaction.atomic():
+        job = EmailJob.objects.create(
+            kind=kind,
+            attempt=attempt,
+            run_after=run_after,
+            parent=parent,
+            created_by=user if user is not None and user.is_authenticated else None
+        )
+
+        batch = []
+        for student_id in student_ids:
+            batch.append(Recipient(emailjob_id=job.id, student_id=student_id))
+            if len(batch) >= 500:
+                Recipient.objects.bulk_create(batch)
+                job.total_count += len(batch)
+                batch = []
+        if batch:
+            Recipient.objects.bulk_create(batch)
+            job.total_count += len(batch)
+
+        job.save(update_fields=['total_count'])
+
+    logger.info(f"Queued email job #{job.id} ({kind}) for {job.total_count} students")
+    return job
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running and return it.
+
+    Claiming is a conditional UPDATE on the status column, so several workers
+    can poll the same SQLite database without an external broker.
+    """
+    now = timezone.now()
+    candidates = EmailJob.objects.filter(
+        Q(run_after__isnull=True) | Q(run_after__lte=now),
+        status=EmailJob.STATUS_QUEUED
+    ).order_by('created_at', 'id').values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        claimed = EmailJob.objects.filter(
+            id=job_id,
+            status=EmailJob.STATUS_QUEUED
+        ).update(status=EmailJob.STATUS_RUNNING, started_at=now, heartbeat_at=now)
+
+        if claimed:
+            return EmailJob.objects.get(id=job_id)
+
+    return None
+
+
+def requeue_stale_jobs(stale_after):
+    """Put running jobs whose worker stopped sending heartbeats back on the queue.
+
+    They resume from their checkpoint cursor when claimed again.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    requeued = EmailJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=EmailJob.STATUS_RUNNING
+    ).update(status=EmailJob.STATUS_QUEUED)
+
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale email job(s)")
+    return requeued
+
+
+def retry_delay(attempt):
+    """Jittered exponential backoff before retry number `attempt`"""
+    delay = min(
+        settings.EMAIL_RETRY_MAX_DELAY,
+        settings.EMAIL_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+    )
+    # Equal jitter: keep half the delay, randomise the rest so retries don't synchronise
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def handle_failed_results(results, job=None, user=None):
+    """Schedule transient failures for a retry job and dead-letter the rest.
+
+    Only SMTP failures are handled; students skipped for a missing Gmail
+    address or hall number are left to the statistics endpoints.
+    Returns the retry job, if one was queued.
+    """
+    attempt = job.attempt if job else 1
+    failures = [r for r in results if not r['success'] and 'error_class' in r]
+
+    retry_ids = []
+    dead_letters = []
+    for result in failures:
+        if result.get('retryable') and attempt < settings.EMAIL_RETRY_MAX_ATTEMPTS:
+            retry_ids.append(result['student_id'])
+        else:
+            dead_letters.append(EmailDeadLetter(
+                student_id=result['student_id'],
+                job=job,
+                email=result['email'],
+                exam_hall_number=result.get('exam_hall_number', ''),
+                error_class=result['error_class'],
+                error_code=result.get('error_code'),
+                error_message=result['error'],
+                attempts=attempt
+            ))
+
+    if dead_letters:
+        EmailDeadLetter.objects.bulk_create(dead_letters, batch_size=500)
+        logger.warning(f"Dead-lettered {len(dead_letters)} emails after attempt {attempt}")
+
+    if not retry_ids:
+        return None
+
+    run_after = timezone.now() + timedelta(seconds=retry_delay(attempt))
+    retry_job = enqueue_email_job(
+        EmailJob.KIND_RETRY,
+        retry_ids,
+        user=user if user is not None else (job.created_by if job else None),
+        attempt=attempt + 1,
+        run_after=run_after,
+        parent=job
+    )
+    logger.info(f"Scheduled {len(retry_ids)} transient failures for retry at {run_after.isoformat()}")
+    return retry_job
+
+
+class JobHeartbeat:
+    """Touches a running job's heartbeat_at from a background thread.
+
+    Progress reports only arrive once per status batch, so a run stuck on slow
+    sends would otherwise look stale and be requeued while it is still going.
+    """
+
+    def __init__(self, job_id, interval=None):
+        self.job_id = job_id
+        self.interval = settings.EMAIL_JOB_HEARTBEAT_INTERVAL if interval is None else interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f'email-job-{job_id}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    EmailJob.objects.filter(id=self.job_id).update(heartbeat_at=timezone.now())
+                except OperationalError as e:
+                    # A locked SQLite database only delays this beat; the next one retries
+                    logger.warning(f"Email job #{self.job_id} heartbeat skipped: {str(e)}")
+        finally:
+            connection.close()
+
+
+def run_email_job(job):
+    """Send the emails for a claimed job and record the outcome on it.
+
+    Recipients are sent in (branch, year, roll_number) chunks. After each
+    chunk the job stores a cursor with the last key and the counts so far, so
+    a job picked up again after a worker restart seeks straight past
+    everything already processed instead of re-scanning or re-sending it.
+
+    If the run itself fails part way (a database lock in the status flush,
+    say), the job goes back on the queue with a backoff and resumes from its
+    cursor, up to EMAIL_JOB_MAX_RESUMES times before it is marked failed.
+    """
+    checkpoint = job.cursor or {}
+    after = checkpoint.get('key')
+    sent_total = checkpoint.get('sent', 0)
+    failed_total = checkpoint.get('failed', 0)
+    resumes = checkpoint.get('resumes', 0)
+    # Only failures are kept; successes are summarised by the counters
+    failures = list(job.results) if after else []
+
+    if after:
+        logger.info(f"Resuming email job #{job.id} after {after}")
+
+    def report_progress(sent, failed):
+        EmailJob.objects.filter(id=job.id).update(
+            sent_count=sent_total + sent,
+            failed_count=failed_total + failed,
+            heartbeat_at=timezone.now()
+        )
+
+    try:
+        with JobHeartbeat(job.id):
+            for chunk in iter_keyset_chunks(
+                    job.recipients.all(), settings.EMAIL_JOB_CHUNK_SIZE, after, fields=EMAIL_FIELDS):
+                results = send_bulk_emails(chunk, on_progress=report_progress)
+                chunk_failures = [r for r in results if not r['success']]
+
+                # Retries run later as their own job so this run never waits on them
+                handle_failed_results(results, job)
+
+                sent_total += len(results) - len(chunk_failures)
+                failed_total += len(chunk_failures)
+                failures.extend(chunk_failures)
+
+                job.cursor = {
+                    'key': student_key(chunk[-1]),
+                    'sent': sent_total,
+                    'failed': failed_total,
+                    'resumes': resumes
+                }
+                EmailJob.objects.filter(id=job.id).update(
+                    cursor=job.cursor,
+                    results=failures,
+                    sent_count=sent_total,
+                    failed_count=failed_total,
+                    heartbeat_at=timezone.now()
+                )
+                # Keep the instance in step so the final save never rolls the checkpoint back
+                job.results = list(failures)
+                job.sent_count = sent_total
+                job.failed_count = failed_total
+
+        job.status = EmailJob.STATUS_COMPLETED
+        job.error = ''
+
+    except Exception as e:
+        job.error = str(e)
+        if resumes < settings.EMAIL_JOB_MAX_RESUMES:
+            logger.warning(f"Email job #{job.id} stopped ({str(e)}), requeued to resume from its cursor")
+            job.status = EmailJob.STATUS_QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=retry_delay(resumes + 1))
+            job.cursor = {**(job.cursor or {}), 'resumes': resumes + 1}
+        else:
+            logger.error(f"Email job #{job.id} failed: {str(e)}")
+            job.status = EmailJob.STATUS_FAILED
+
+    if job.is_finished:
+        job.finished_at = timezone.now()
+    job.save(update_fields=[
+        'results', 'sent_count', 'failed_count', 'status', 'error', 'finished_at', 'run_after', 'cursor'
+    ])
+    return job
@@ -0,0 +1,436 @@
+# students/mailer.py
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.query import QuerySet
+from django.utils import timezone
+from .models import Student, EmailDelivery
+from .email_templates import get_exam_notice
+from .ratelimit import get_email_rate_limiter
+from .querysets import EMAIL_FIELDS, iter_keyset_chunks
+from .statistics import refresh_student_stats
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+import smtplib
+import time
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the SMTP session itself is gone and is worth reopening once
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+def smtp_error_code(exc):
+    """Return the SMTP reply code carried by an exception, if any"""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return max(codes) if codes else None
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code
+    return None
+
+
+def is_transient_error(exc):
+    """Whether a send failure is worth retrying later.
+
+    4xx replies (421 service closing, 45x mailbox busy / local error) and
+    dropped or refused connections are transient; 5xx replies and anything
+    unrecognised are permanent.
+    """
+    code = smtp_error_code(exc)
+    if code is not None:
+        return 400 <= code < 500
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    # Resets, timeouts, refused connections and DNS failures
+    return isinstance(exc, OSError)
+
+
+class SMTPSession:
+    """Persistent SMTP connection shared by every message of a send run.
+
+    The connection is opened lazily on the first message and transparently
+    reopened once if the server drops it partway through the run. Every
+    message first takes a token from the shared email rate limiter.
+    """
+
+    def __init__(self, rate_limiter=None):
+        self.connection = None
+        self.rate_limiter = rate_limiter or get_email_rate_limiter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        if self.connection is None:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+            # Only keep a connection that actually opened; an unopened backend would
+            # silently open and close a new connection for every message
+            self.connection = connection
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception as e:
+                logger.warning(f"Error closing SMTP connection: {str(e)}")
+            self.connection = None
+
+    def send(self, message):
+        """Send a single message, reconnecting once if the session was dropped"""
+        self.rate_limiter.acquire()
+
+        try:
+            return self.open().send_messages([message])
+        except RECONNECT_ERRORS as e:
+            logger.warning(f"SMTP connection lost ({str(e)}), reconnecting")
+            self.close()
+            return self.open().send_messages([message])
+
+
+class EmailStatusBuffer:
+    """Collects successfully mailed students and records them in batches.
+
+    Each flush writes email_sent=True with one UPDATE, then records the
+    deliveries with one lookup, one UPDATE bumping send_count for content
+    already in the ledger and one INSERT for the rest. Flushes happen once the batch is full or the
+    flush interval has passed, so a crash loses at most one batch of status
+    updates while long runs no longer write one transaction per message.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or settings.EMAIL_STATUS_BATCH_SIZE
+        self.flush_interval = (
+            settings.EMAIL_STATUS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.pending = []
+        self.flushed_count = 0
+        self.last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def add(self, student, content_hash=None):
+        self.pending.append((student, content_hash))
+
+        if (len(self.pending) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write email_sent=True and the ledger rows for every buffered student"""
+        self.last_flush = time.monotonic()
+
+        if not self.pending:
+            return 0
+
+        pending, self.pending = self.pending, []
+        Student.objects.filter(id__in=[student.id for student, _ in pending]).update(email_sent=True)
+        refresh_student_stats({student.stats_group() for student, _ in pending})
+
+        self.record_deliveries([(student, content_hash) for student, content_hash in pending if content_hash])
+
+        self.flushed_count += len(pending)
+        return len(pending)
+
+    def record_deliveries(self, sent, batch_size=500):
+        """Add ledger rows for new (student, content) pairs and count repeat sends of existing ones"""
+        for start in range(0, len(sent), batch_size):
+            batch = sent[start:start + batch_size]
+            content_hashes = {student.id: content_hash for student, content_hash in batch}
+
+            existing = {
+                student_id: delivery_id
+                for delivery_id, student_id, content_hash in EmailDelivery.objects.filter(
+                    student_id__in=list(content_hashes),
+                    content_hash__in=set(content_hashes.values())
+                ).values_list('id', 'student_id', 'content_hash')
+                if content_hashes[student_id] == content_hash
+            }
+
+            # Forced resends of the same content bump send_count, as record_delivery does
+            if existing:
+                EmailDelivery.objects.filter(id__in=list(existing.values())).update(
+                    send_count=F('send_count') + 1, last_sent_at=timezone.now()
+                )
+
+            deliveries = [
+                EmailDelivery(
+                    student_id=student.id,
+                    content_hash=content_hash,
+                    exam_hall_number=student.exam_hall_number or '',
+                    email=student.gmail_address or ''
+                )
+                for student, content_hash in batch if student.id not in existing
+            ]
+            if deliveries:
+                EmailDelivery.objects.bulk_create(deliveries, ignore_conflicts=True)
+
+
+def record_delivery(student, content_hash):
+    """Record a single delivery in the ledger, counting repeat sends of the same content"""
+    updated = EmailDelivery.objects.filter(
+        student_id=student.id,
+        content_hash=content_hash
+    ).update(send_count=F('send_count') + 1, last_sent_at=timezone.now())
+
+    if not updated:
+        EmailDelivery.objects.create(
+            student_id=student.id,
+            content_hash=content_hash,
+            exam_hall_number=student.exam_hall_number or '',
+            email=student.gmail_address or ''
+        )
+
+
+def find_delivered(students, content_hashes, batch_size=500):
+    """Return the ids of students whose latest delivery carried their current content.
+
+    Only each student's most recent ledger row counts, so a student moved
+    back to a hall they were notified about earlier is mailed again. Issues
+    one indexed query per batch of students rather than one per student.
+    """
+    delivered = set()
+    latest = EmailDelivery.objects.filter(
+        student_id=OuterRef('student_id')
+    ).order_by('-last_sent_at', '-id').values('id')[:1]
+
+    for start in range(0, len(students), batch_size):
+        batch = students[start:start + batch_size]
+        pairs = EmailDelivery.objects.filter(
+            student_id__in=[student.id for student in batch],
+            id=Subquery(latest)
+        ).values_list('student_id', 'content_hash')
+
+        delivered.update(
+            student_id for student_id, content_hash in pairs
+            if content_hashes.get(student_id) == content_hash
+        )
+
+    return delivered
+
+
+def build_email_result(student, success, **extra):
+    """Build the per-student result dict returned by the email endpoints"""
+    result = {
+        'success': success,
+        'student_id': student.id,
+        'roll_number': student.roll_number,
+        'email': student.gmail_address or '',
+        'exam_hall_number': student.exam_hall_number or '',
+    }
+    result.update(extra)
+    return result
+
+
+def build_exam_room_email(student, notice=None):
+    """Build the exam room allocation email (text with an HTML alternative) for a student"""
+    if notice is None:
+        notice = get_exam_notice()
+
+    subject, text, html = notice.render(student)
+
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=text,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[student.gmail_address],
+    )
+    if html:
+        message.attach_alternative(html, 'text/html')
+    return message
+
+
+def send_exam_room_email(student, session=None, notice=None):
+    """Send exam room allocation email to student's Gmail"""
+    if not student.gmail_address:
+        return build_email_result(student, False, error='No Gmail address found')
+
+    if not student.exam_hall_number:
+        return build_email_result(student, False, error='No exam hall number assigned')
+
+    try:
+        message = build_exam_room_email(student, notice)
+
+        if session is None:
+            with SMTPSession() as own_session:
+                own_session.send(message)
+        else:
+            session.send(message)
+
+        logger.info(f"Email sent successfully to {student.roll_number} at {student.gmail_address}")
+
+        return build_email_result(student, True, message='Email sent successfully to Gmail')
+
+    except Exception as e:
+        logger.error(f"Failed to send email to {student.roll_number} at {student.gmail_address}: {str(e)}")
+        return build_email_result(
+            student, False,
+            error=str(e),
+            error_class=type(e).__name__,
+            error_code=smtp_error_code(e),
+            retryable=is_transient_error(e)
+        )
+
+
+def _send_worker(pending, done, notice):
+    """Drain the pending queue over this thread's own SMTP connection"""
+    try:
+        with SMTPSession() as session:
+            while True:
+                try:
+                    index, student = pending.get_nowait()
+                except queue.Empty:
+                    return
+                done.put((index, send_exam_room_email(student, session=session, notice=notice)))
+    finally:
+        # The rate limiter opened a database connection for this thread
+        connections.close_all()
+        done.put(None)
+
+
+def dispatch_emails(students, workers=1, notice=None):
+    """Send exam-room emails and yield (index, result) pairs as they complete.
+
+    With more than one worker the students are fanned out across a bounded
+    thread pool, each thread holding its own SMTP connection. All threads draw
+    from the same shared rate limiter, so parallelism only hides network round
+    trips and never raises the global send rate.
+    """
+    if notice is None:
+        notice = get_exam_notice()
+
+    if workers <= 1 or len(students) <= 1:
+        with SMTPSession() as session:
+            for index, student in enumerate(students):
+                yield index, send_exam_room_email(student, session=session, notice=notice)
+        return
+
+    pending = queue.Queue()
+    done = queue.Queue()
+    for item in enumerate(students):
+        pending.put(item)
+
+    thread_count = min(workers, len(students))
+    finished = 0
+
+    with ThreadPoolExecutor(max_workers=thread_count, thread_name_prefix='email-sender') as executor:
+        for _ in range(thread_count):
+            executor.submit(_send_worker, pending, done, notice)
+
+        try:
+            while finished < thread_count:
+                item = done.get()
+                if item is None:
+                    finished += 1
+                    continue
+                yield item
+        finally:
+            # If the consumer stops early (an error, or the generator closed), drop the
+            # unsent students so the workers stop after their current message instead of
+            # mailing everyone without their status ever being recorded
+            while True:
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    break
+
+
+def _send_chunk(students, workers, force, notice, status_buffer, tally, on_progress):
+    """Send one chunk of a bulk run and return its results in input order"""
+    results = [None] * len(students)
+
+    content_hashes = {student.id: notice.content_hash(student) for student in students}
+    delivered = set() if force else find_delivered(students, content_hashes)
+
+    to_send = []
+    for index, student in enumerate(students):
+        if student.id in delivered:
+            results[index] = build_email_result(
+                student, True, skipped=True, message='Already delivered with the same content'
+            )
+            if not student.email_sent:
+                student.email_sent = True
+                status_buffer.add(student)
+            tally['skipped'] += 1
+        else:
+            to_send.append(index)
+
+    if on_progress:
+        on_progress(tally['skipped'] + tally['sent'], tally['failed'])
+
+    # Throttling happens per message in SMTPSession through the shared rate limiter
+    for position, result in dispatch_emails([students[i] for i in to_send], workers, notice):
+        index = to_send[position]
+        results[index] = result
+
+        # Update email_sent status and the ledger in batches
+        if result['success']:
+            student = students[index]
+            student.email_sent = True
+            status_buffer.add(student, content_hashes[student.id])
+            tally['sent'] += 1
+        else:
+            tally['failed'] += 1
+
+        if on_progress and (tally['sent'] + tally['failed']) % status_buffer.batch_size == 0:
+            status_buffer.flush()
+            on_progress(tally['skipped'] + tally['sent'], tally['failed'])
+
+    # Results stay in input order regardless of which thread finished first
+    for index, result in enumerate(results):
+        if result is None:
+            results[index] = build_email_result(
+                students[index], False, error='Email was not sent: sender stopped unexpectedly'
+            )
+            tally['failed'] += 1
+
+    return results
+
+
+def send_bulk_emails(students, workers=None, force=False, on_progress=None):
+    """Send emails to multiple students' Gmail addresses over persistent SMTP connections.
+
+    Students whose current notice is already in the delivery ledger are
+    skipped without touching SMTP unless force is set. If given,
+    on_progress(sent, failed) is called after every status batch is flushed,
+    with skipped students counted as sent. A queryset is read in keyset
+    chunks with only the columns the notice needs, so model instances for
+    at most one chunk are in memory at a time.
+    """
+    if workers is None:
+        workers = settings.EMAIL_SEND_WORKERS
+
+    if isinstance(students, QuerySet):
+        chunks = iter_keyset_chunks(students, settings.EMAIL_JOB_CHUNK_SIZE, fields=EMAIL_FIELDS)
+    else:
+        chunks = [list(students)]
+
+    notice = get_exam_notice()
+    results = []
+    tally = {'sent': 0, 'skipped': 0, 'failed': 0}
+
+    with EmailStatusBuffer() as status_buffer:
+        for chunk in chunks:
+            results.extend(_send_chunk(chunk, workers, force, notice, status_buffer, tally, on_progress))
+
+    if on_progress:
+        on_progress(tally['skipped'] + tally['sent'], tally['failed'])
+
+    logger.info(
+        f"Bulk email completed: {tally['sent']}/{len(results)} emails sent successfully, "
+        f"{tally['skipped']} already delivered, using up to {workers} connection(s)"
+    )
+    return results
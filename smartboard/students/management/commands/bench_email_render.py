@@ -0,0 +1,65 @@
+# students/management/commands/bench_email_render.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from students.models import Student
+from students.email_templates import get_exam_notice
+from students.mailer import build_exam_room_email
+import time
+
+
+class Command(BaseCommand):
+    help = 'Benchmark exam notice rendering against the configured send rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help='Number of notices to render')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        branches = [code for code, _ in Student.BRANCH_CHOICES]
+        years = [code for code, _ in Student.YEAR_CHOICES]
+
+        # Unsaved instances: rendering never touches the student table
+        students = [
+            Student(
+                id=i + 1,
+                name=f'Student {i}',
+                roll_number=f'BENCH{i:06d}',
+                branch=branches[i % len(branches)],
+                year=years[i % len(years)],
+                gmail_address=f'student{i}@gmail.com',
+                exam_hall_number=str(100 + i % 300)
+            )
+            for i in range(count)
+        ]
+
+        start = time.perf_counter()
+        notice = get_exam_notice()
+        compile_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for student in students:
+            notice.render(student)
+        render_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for student in students:
+            build_exam_room_email(student, notice).message().as_bytes()
+        message_seconds = time.perf_counter() - start
+
+        rate = settings.EMAIL_RATE_LIMIT_PER_SECOND
+        send_seconds = count / rate if rate > 0 else 0
+
+        self.stdout.write(f'Template lookup + compile: {compile_seconds * 1000:.1f} ms')
+        self.stdout.write(
+            f'Render only:     {render_seconds:.2f}s for {count} notices '
+            f'({count / render_seconds:,.0f}/s, {render_seconds / count * 1e6:.0f} us each)'
+        )
+        self.stdout.write(
+            f'Render + MIME:   {message_seconds:.2f}s for {count} notices '
+            f'({count / message_seconds:,.0f}/s, {message_seconds / count * 1e6:.0f} us each)'
+        )
+        if send_seconds:
+            self.stdout.write(self.style.SUCCESS(
+                f'At {rate:g} msg/s sending takes {send_seconds:,.0f}s; '
+                f'building messages is {message_seconds / send_seconds:.2%} of that'
+            ))
@@ -0,0 +1,148 @@
+# students/management/commands/bench_email_throughput.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from students.benchmarks import (
+    FakeSMTPServer, DatabaseWriteCounter, benchmark_database, seed_students,
+    percentile, write_results
+)
+from students.jobs import claim_next_job, run_email_job
+from students.mailer import send_bulk_emails
+from students.models import Student, EmailDelivery, EmailJob, RateLimitBucket
+from students.statistics import reconcile_student_stats
+from students import views
+import json
+import time
+
+PATHS = ['bulk', 'resend', 'upload']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark email throughput of the bulk send, resend and upload paths against a local fake SMTP server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students to seed')
+        parser.add_argument('--paths', default=','.join(PATHS), help=f'Comma-separated subset of {", ".join(PATHS)}')
+        parser.add_argument('--workers', type=int, default=None, help='Parallel SMTP connections (default: EMAIL_SEND_WORKERS)')
+        parser.add_argument('--rate', type=float, default=0, help='Rate limit in messages/sec (0 disables the limiter)')
+        parser.add_argument('--burst', type=int, default=10, help='Rate limiter burst size')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Fake SMTP latency added to every message')
+        parser.add_argument('--transient-failure-rate', type=float, default=0, help='Fraction of recipients refused with 451')
+        parser.add_argument('--permanent-failure-rate', type=float, default=0, help='Fraction of recipients refused with 550')
+        parser.add_argument('--disconnect-rate', type=float, default=0, help='Fraction of messages where the server drops the connection')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for failure injection')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        paths = [path.strip() for path in options['paths'].split(',') if path.strip()]
+        unknown = set(paths) - set(PATHS)
+        if unknown:
+            raise CommandError(f"Unknown paths: {', '.join(sorted(unknown))}")
+
+        server = FakeSMTPServer(
+            latency=options['latency_ms'] / 1000,
+            transient_failure_rate=options['transient_failure_rate'],
+            permanent_failure_rate=options['permanent_failure_rate'],
+            disconnect_rate=options['disconnect_rate'],
+            seed=options['seed']
+        )
+
+        overrides = server.email_settings()
+        overrides.update({
+            'EMAIL_RATE_LIMIT_PER_SECOND': options['rate'],
+            'EMAIL_RATE_LIMIT_BURST': options['burst'],
+        })
+        if options['workers'] is not None:
+            overrides['EMAIL_SEND_WORKERS'] = options['workers']
+
+        results = {}
+        with server, override_settings(**overrides), benchmark_database():
+            seed_students(options['students'])
+            user = User.objects.create_user('bench', password='bench')
+
+            for path in paths:
+                self.reset_state()
+                server.reset_stats()
+                results[path] = self.measure(path, server, user)
+                self.report(path, results[path])
+
+        config = {key: options[key] for key in (
+            'students', 'workers', 'rate', 'burst', 'latency_ms', 'transient_failure_rate',
+            'permanent_failure_rate', 'disconnect_rate', 'seed'
+        )}
+        payload = write_results(options['output'], 'email_throughput', config, results)
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(payload, indent=2))
+
+    def reset_state(self):
+        """Make every path start from 'nobody has been mailed yet'"""
+        Student.objects.update(email_sent=False)
+        reconcile_student_stats()
+        EmailDelivery.objects.all().delete()
+        EmailJob.objects.all().delete()
+        RateLimitBucket.objects.all().delete()
+
+    def measure(self, path, server, user):
+        with DatabaseWriteCounter() as counter:
+            start = time.perf_counter()
+            getattr(self, f'run_{path}')(user)
+            elapsed = time.perf_counter() - start
+
+        latencies = list(server.latencies)
+        delivered = len(latencies)
+        return {
+            'seconds': round(elapsed, 3),
+            'delivered': delivered,
+            'messages_per_second': round(delivered / elapsed, 2) if elapsed else None,
+            'latency_p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+            'latency_p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+            'transient_failures': server.stats['transient_failures'],
+            'permanent_failures': server.stats['permanent_failures'],
+            'db_queries': counter.queries,
+            'db_writes': counter.writes,
+        }
+
+    def run_bulk(self, user):
+        send_bulk_emails(Student.objects.all())
+
+    def run_resend(self, user):
+        request = APIRequestFactory().post('/api/students/resend-pending-emails/', {}, format='json')
+        force_authenticate(request, user=user)
+        views.resend_emails_to_pending_students(request)
+        self.drain_jobs()
+
+    def run_upload(self, user):
+        # Move everyone to a new hall so every student is (re)notified
+        rows = ['S.No,Roll No,Room No']
+        for index, roll_number in enumerate(
+                Student.objects.order_by('id').values_list('roll_number', flat=True).iterator()):
+            rows.append(f'{index + 1},{roll_number},{500 + index % 300}')
+        upload = SimpleUploadedFile('bench.csv', '\n'.join(rows).encode('utf-8'), content_type='text/csv')
+
+        request = APIRequestFactory().post(
+            '/api/students/upload-rooms/', {'file': upload, 'send_emails': True}, format='multipart'
+        )
+        force_authenticate(request, user=user)
+        views.upload_exam_room_file(request)
+        self.drain_jobs()
+
+    def drain_jobs(self):
+        """Run queued jobs inline, as the email worker would (retries are left queued)"""
+        while True:
+            job = claim_next_job()
+            if job is None:
+                return
+            run_email_job(job)
+
+    def report(self, path, result):
+        self.stdout.write(
+            f"{path:>7}: {result['delivered']} delivered in {result['seconds']}s "
+            f"({result['messages_per_second']} msg/s, p50 {result['latency_p50_ms']} ms, "
+            f"p99 {result['latency_p99_ms']} ms, {result['db_writes']} DB writes)",
+            self.style.SUCCESS
+        )
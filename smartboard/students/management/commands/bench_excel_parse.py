@@ -0,0 +1,90 @@
+# students/management/commands/bench_excel_parse.py
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from students.benchmarks import write_results
+from students.excel import available_engines, read_excel
+import io
+import json
+import openpyxl
+import pandas as pd
+import time
+import tracemalloc
+
+DEFAULT_SIZES = '10000,50000'
+
+
+def build_workbook(rows):
+    """xlsx bytes for a seating sheet with `rows` students and a few columns uploads ignore"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Seating')
+    sheet.append(['S.No', 'Roll No', 'Name', 'Branch', 'Room No', 'Remarks'])
+    for i in range(rows):
+        sheet.append([i + 1, f'BENCH{i:06d}', f'Bench Student {i}', 'CSE', 100 + i % 300, 'Seat allotted'])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parse time and peak memory of each Excel engine used for seating uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Comma-separated row counts')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        # 'legacy' is the old pd.read_excel(file): default engine, every column
+        engines = ['legacy'] + available_engines()
+        results = {}
+
+        for rows in sizes:
+            content = build_workbook(rows)
+            results[str(rows)] = {}
+
+            for engine in engines:
+                seconds = self.measure(engine, content, trace=False)
+                peak = self.measure(engine, content, trace=True)
+                results[str(rows)][engine] = {
+                    'seconds': round(seconds, 3),
+                    'rows_per_second': round(rows / seconds),
+                    'peak_memory_mb': round(peak / 2 ** 20, 1),
+                }
+                self.report(rows, engine, results[str(rows)][engine])
+
+        config = {'sizes': sizes, 'engines': engines}
+        payload = write_results(options['output'], 'excel_parse', config, results)
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(payload, indent=2))
+
+    def measure(self, engine, content, trace):
+        """Seconds taken to parse, or the traced peak allocation in bytes when `trace` is set"""
+        upload = SimpleUploadedFile('bench.xlsx', content)
+
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+
+        if engine == 'legacy':
+            pd.read_excel(upload)
+        else:
+            read_excel(upload, engine=engine)
+
+        elapsed = time.perf_counter() - start
+        if not trace:
+            return elapsed
+
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    def report(self, rows, engine, result):
+        self.stdout.write(
+            f"{rows:>7} rows {engine:>9}: {result['seconds']}s "
+            f"({result['rows_per_second']:,} rows/s, peak {result['peak_memory_mb']} MB)",
+            self.style.SUCCESS
+        )
@@ -0,0 +1,57 @@
+# students/management/commands/bench_hall_allocation.py
+from django.core.management.base import BaseCommand
+from students.allocation import allocate_exam_halls
+from students.benchmarks import DatabaseWriteCounter, benchmark_database, seed_students, write_results
+from students.models import Student, Room
+import json
+import math
+import time
+
+
+class Command(BaseCommand):
+    help = 'Benchmark exam hall allocation of every student across a set of rooms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000, help='Number of students to seed')
+        parser.add_argument('--rooms', type=int, default=300, help='Number of rooms to create')
+        parser.add_argument('--interleave', action='store_true', help='Alternate branches within rooms')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        results = {}
+
+        with benchmark_database():
+            seed_students(options['students'], with_hall=False)
+            capacity = math.ceil(options['students'] / options['rooms'])
+            Room.objects.bulk_create(
+                [Room(number=f'R{i:03d}', capacity=capacity, position=i) for i in range(options['rooms'])]
+            )
+
+            # First run seats everyone; the second finds everyone already seated
+            for run in ('initial', 'repeat'):
+                with DatabaseWriteCounter() as counter:
+                    start = time.perf_counter()
+                    summary, _ = allocate_exam_halls(Student.objects.all(), interleave=options['interleave'])
+                    elapsed = time.perf_counter() - start
+
+                results[run] = {
+                    'seconds': round(elapsed, 3),
+                    'allocated': summary['allocated_count'],
+                    'changed': summary['changed_count'],
+                    'rooms_used': summary['rooms_used'],
+                    'db_queries': counter.queries,
+                    'db_writes': counter.writes,
+                }
+                self.stdout.write(
+                    f"{run:>8}: {summary['allocated_count']} students in {summary['rooms_used']} rooms "
+                    f"in {elapsed:.3f}s ({counter.queries} queries, {counter.writes} writes)",
+                    self.style.SUCCESS
+                )
+
+        config = {key: options[key] for key in ('students', 'rooms', 'interleave')}
+        payload = write_results(options['output'], 'hall_allocation', config, results)
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(payload, indent=2))
@@ -0,0 +1,108 @@
+# students/management/commands/bench_upload_parse.py
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from students.benchmarks import write_results
+from students.serializers import ExamRoomUploadSerializer
+import json
+import time
+
+DEFAULT_SIZES = '1000,10000,100000'
+
+
+def legacy_clean_rows(df):
+    """The original row-by-row cleaning loop, kept as the baseline"""
+    df = df.dropna(subset=['roll_number', 'room_number'])
+
+    processed_data = []
+    errors = []
+
+    for index, row in df.iterrows():
+        try:
+            roll_number = str(row['roll_number']).strip().upper()
+            room_number = str(row['room_number']).strip()
+
+            if not roll_number or not room_number:
+                errors.append(f"Row {index + 2}: Roll number and room number cannot be empty")
+                continue
+
+            processed_data.append({
+                'roll_number': roll_number,
+                'room_number': room_number
+            })
+
+        except Exception as e:
+            errors.append(f"Row {index + 2}: {str(e)}")
+
+    return processed_data, errors
+
+
+def build_sheet(rows):
+    """CSV bytes for a seating sheet with `rows` students"""
+    lines = ['S.No,Roll No,Room No']
+    for i in range(rows):
+        lines.append(f'{i + 1}, bench{i:06d} ,{100 + i % 300}')
+    return '\n'.join(lines).encode('utf-8')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark exam room upload parsing (row loop vs column operations) in rows/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Comma-separated row counts')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the fastest is kept')
+        parser.add_argument('--output', help='Write the results as JSON to this path')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        serializer = ExamRoomUploadSerializer()
+        results = {}
+
+        for rows in sizes:
+            content = build_sheet(rows)
+
+            # Whole upload path: CSV parse, column mapping and cleaning
+            parse_seconds = self.best_of(options['repeat'], lambda: serializer.process_file(
+                SimpleUploadedFile('bench.csv', content, content_type='text/csv')
+            ))
+
+            original = serializer.clean_rows
+            serializer.clean_rows = legacy_clean_rows
+            try:
+                legacy_parse_seconds = self.best_of(options['repeat'], lambda: serializer.process_file(
+                    SimpleUploadedFile('bench.csv', content, content_type='text/csv')
+                ))
+            finally:
+                serializer.clean_rows = original
+
+            results[str(rows)] = {
+                'legacy_rows_per_second': round(rows / legacy_parse_seconds),
+                'vectorized_rows_per_second': round(rows / parse_seconds),
+                'legacy_seconds': round(legacy_parse_seconds, 4),
+                'vectorized_seconds': round(parse_seconds, 4),
+                'speedup': round(legacy_parse_seconds / parse_seconds, 2),
+            }
+            self.report(rows, results[str(rows)])
+
+        config = {'sizes': sizes, 'repeat': options['repeat']}
+        payload = write_results(options['output'], 'upload_parse', config, results)
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(payload, indent=2))
+
+    def best_of(self, repeat, func):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def report(self, rows, result):
+        self.stdout.write(
+            f"{rows:>7} rows: {result['legacy_rows_per_second']:,} -> "
+            f"{result['vectorized_rows_per_second']:,} rows/s ({result['speedup']}x)",
+            self.style.SUCCESS
+        )
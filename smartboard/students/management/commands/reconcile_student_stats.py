@@ -0,0 +1,27 @@
+# students/management/commands/reconcile_student_stats.py
+from django.core.management.base import BaseCommand
+from students.statistics import reconcile_student_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard statistics table from the students and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the (branch, year) groups that have drifted'
+        )
+
+    def handle(self, *args, **options):
+        drifted = reconcile_student_stats(dry_run=options['dry_run'])
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Student statistics are in sync'))
+            return
+
+        groups = ', '.join(f'{branch} {year}' for branch, year in drifted)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drifted)} group(s) have drifted: {groups}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drifted)} group(s): {groups}'))
@@ -0,0 +1,54 @@
+# students/management/commands/run_email_worker.py
+from django.core.management.base import BaseCommand
+from students.jobs import claim_next_job, requeue_stale_jobs, run_email_job
+import time
+
+
+class Command(BaseCommand):
+    help = 'Drain the queue of exam-room email jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling for new jobs'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=float,
+            default=600.0,
+            help='Requeue running jobs with no heartbeat for this many seconds (resumed from their cursor)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Email worker started'))
+
+        try:
+            while True:
+                requeue_stale_jobs(options['stale_after'])
+                job = claim_next_job()
+
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f'Running {job}')
+                job = run_email_job(job)
+                if not job.is_finished:
+                    self.stdout.write(self.style.WARNING(f'Requeued {job} after an error: {job.error}'))
+                    continue
+                self.stdout.write(
+                    f'Finished {job}: {job.sent_count} sent, {job.failed_count} failed'
+                )
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('Email worker stopped'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('subject', models.CharField(max_length=200)),
+                ('text_body', models.TextField(help_text='Plain-text body (Django template syntax)')),
+                ('html_body', models.TextField(blank=True, help_text='Optional HTML body sent as a multipart alternative')),
+                ('is_active', models.BooleanField(default=True)),
+                ('version', models.PositiveIntegerField(default=1, editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Email Template',
+                'verbose_name_plural': 'Email Templates',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_emailtemplate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('exam_hall_number', models.CharField(blank=True, max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('send_count', models.PositiveIntegerField(default=1)),
+                ('first_sent_at', models.DateTimeField(auto_now_add=True)),
+                ('last_sent_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_deliveries', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Email Delivery',
+                'verbose_name_plural': 'Email Deliveries',
+                'ordering': ['-last_sent_at'],
+                'unique_together': {('student', 'content_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0012_emaildelivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailjob',
+            name='attempt',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='emailjob',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='retries', to='students.emailjob'),
+        ),
+        migrations.AddField(
+            model_name='emailjob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, help_text='Not claimed by workers before this time', null=True),
+        ),
+        migrations.AlterField(
+            model_name='emailjob',
+            name='kind',
+            field=models.CharField(choices=[('upload', 'Exam room upload'), ('bulk', 'Bulk email'), ('resend', 'Resend pending emails'), ('admin', 'Admin bulk email'), ('retry', 'Retry failed emails')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='EmailDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(blank=True, max_length=254)),
+                ('exam_hall_number', models.CharField(blank=True, max_length=20)),
+                ('error_class', models.CharField(max_length=100)),
+                ('error_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dead_letters', to='students.emailjob')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='email_dead_letters', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Email Dead Letter',
+                'verbose_name_plural': 'Email Dead Letters',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['error_class', 'created_at'], name='students_em_error_c_3fa382_idx')],
+            },
+        ),
+    ]
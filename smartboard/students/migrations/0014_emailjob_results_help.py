@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0013_email_retries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailjob',
+            name='results',
+            field=models.JSONField(blank=True, default=list, help_text='Per-student results of failed sends'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0014_emailjob_results_help'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailjob',
+            name='cursor',
+            field=models.JSONField(blank=True, help_text='Checkpoint: last (branch, year, roll_number) processed and the counts up to it', null=True),
+        ),
+        migrations.AddField(
+            model_name='emailjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
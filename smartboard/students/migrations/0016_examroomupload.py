@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0015_emailjob_checkpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamRoomUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(db_index=True, help_text='SHA-256 of the uploaded file', max_length=64)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.PositiveBigIntegerField(default=0)),
+                ('added_count', models.PositiveIntegerField(default=0, help_text='Students who had no hall before')),
+                ('changed_count', models.PositiveIntegerField(default=0, help_text='Students moved to a different hall')),
+                ('unchanged_count', models.PositiveIntegerField(default=0, help_text='Students already in the uploaded hall')),
+                ('not_found_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('email_job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='uploads', to='students.emailjob')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exam_room_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exam Room Upload',
+                'verbose_name_plural': 'Exam Room Uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0016_examroomupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(help_text="Stored as the students' exam hall number", max_length=20, unique=True)),
+                ('capacity', models.PositiveIntegerField()),
+                ('position', models.PositiveIntegerField(default=0, help_text='Rooms are filled in this order, then by number')),
+                ('is_active', models.BooleanField(default=True, help_text='Only active rooms are used for allocation')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Room',
+                'verbose_name_plural': 'Rooms',
+                'ordering': ['position', 'number'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='emailjob',
+            name='kind',
+            field=models.CharField(choices=[('upload', 'Exam room upload'), ('bulk', 'Bulk email'), ('resend', 'Resend pending emails'), ('admin', 'Admin bulk email'), ('retry', 'Retry failed emails'), ('allocation', 'Exam hall allocation')], max_length=10),
+        ),
+    ]
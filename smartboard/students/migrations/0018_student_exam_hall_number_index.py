@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0017_room'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='exam_hall_number',
+            field=models.CharField(blank=True, db_index=True, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:48
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_student_stats(apps, schema_editor):
+    Student = apps.get_model('students', 'Student')
+    StudentStats = apps.get_model('students', 'StudentStats')
+    # Frozen copy of students.statistics.GROUP_AGGREGATES, so later changes there cannot alter this migration
+    aggregates = {
+        'count': Count('id'),
+        'emails_sent': Count('id', filter=Q(email_sent=True)),
+        'with_room': Count('id', filter=~Q(exam_hall_number='')),
+        'with_gmail': Count('id', filter=~Q(gmail_address='')),
+        'ready_for_email': Count('id', filter=Q(
+            gmail_address__isnull=False,
+            exam_hall_number__isnull=False,
+            email_sent=False
+        ) & ~Q(gmail_address='', exam_hall_number='')),
+        'missing_gmail': Count('id', filter=Q(gmail_address__isnull=True) | Q(gmail_address='')),
+        'missing_room': Count('id', filter=Q(exam_hall_number__isnull=True) | Q(exam_hall_number='')),
+    }
+
+    rows = Student.objects.order_by().values('branch', 'year').annotate(**aggregates)
+    StudentStats.objects.bulk_create([
+        StudentStats(branch=row['branch'], year=row['year'], **{field: row[field] for field in aggregates})
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0018_student_exam_hall_number_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(choices=[('CSE', 'Computer Science & Engineering (CSE)'), ('CSM', 'Computer Science & Engineering - AI & ML (CSM)'), ('CAI', 'Computer Science & Engineering - Artificial Intelligence (CAI)'), ('CSD', 'Computer Science & Engineering - Data Science (CSD)'), ('CSC', 'Computer Science & Engineering - Cyber Security (CSC)'), ('ECE', 'Electronics and Communication Engineering (ECE)'), ('EEE', 'Electrical and Electronics Engineering (EEE)'), ('ME', 'Mechanical Engineering (ME)'), ('CIV', 'Civil Engineering (CIV)')], max_length=10)),
+                ('year', models.CharField(choices=[('1', '1st Year'), ('2', '2nd Year'), ('3', '3rd Year'), ('4', '4th Year')], max_length=1)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('emails_sent', models.PositiveIntegerField(default=0)),
+                ('with_room', models.PositiveIntegerField(default=0)),
+                ('with_gmail', models.PositiveIntegerField(default=0)),
+                ('ready_for_email', models.PositiveIntegerField(default=0)),
+                ('missing_gmail', models.PositiveIntegerField(default=0)),
+                ('missing_room', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Student Statistics',
+                'verbose_name_plural': 'Student Statistics',
+                'ordering': ['branch', 'year'],
+                'unique_together': {('branch', 'year')},
+            },
+        ),
+        migrations.RunPython(populate_student_stats, migrations.RunPython.noop),
+    ]
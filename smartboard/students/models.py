@@ -1,6 +1,9 @@
 # students/models.py
 from django.db import models
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator, EmailValidator
+from django.template import Engine, TemplateSyntaxError
 
 class Student(models.Model):
     BRANCH_CHOICES = [
@@ -53,7 +56,7 @@ class Student(models.Model):
     
     branch = models.CharField(max_length=10, choices=BRANCH_CHOICES)
     year = models.CharField(max_length=1, choices=YEAR_CHOICES, default='1')
-    exam_hall_number = models.CharField(max_length=20, null=True, blank=True)
+    exam_hall_number = models.CharField(max_length=20, null=True, blank=True, db_index=True)
     email_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -66,6 +69,19 @@ class Student(models.Model):
     
     def __str__(self):
         return f"{self.roll_number} - {self.name} ({self.branch} {self.year})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Group as loaded, so saving a student moved to another branch or year refreshes both
+        instance._stats_group = instance.stats_group()
+        return instance
+
+    def stats_group(self):
+        """(branch, year) StudentStats row this student counts towards, None if either is deferred"""
+        if 'branch' not in self.__dict__ or 'year' not in self.__dict__:
+            return None
+        return (self.branch, self.year)
     
     @property
     def email_address(self):
@@ -77,4 +93,258 @@ class Student(models.Model):
     
     @property
     def full_class_info(self):
-        return f"{self.get_branch_display()} - {self.get_year_display()}"
\ No newline at end of file
+        return f"{self.get_branch_display()} - {self.get_year_display()}"
+
+
+class EmailJob(models.Model):
+    """Queued exam-room email dispatch, drained by the run_email_worker command"""
+    KIND_UPLOAD = 'upload'
+    KIND_BULK = 'bulk'
+    KIND_RESEND = 'resend'
+    KIND_ADMIN = 'admin'
+    KIND_RETRY = 'retry'
+    KIND_ALLOCATION = 'allocation'
+
+    KIND_CHOICES = [
+        (KIND_UPLOAD, 'Exam room upload'),
+        (KIND_BULK, 'Bulk email'),
+        (KIND_RESEND, 'Resend pending emails'),
+        (KIND_ADMIN, 'Admin bulk email'),
+        (KIND_RETRY, 'Retry failed emails'),
+        (KIND_ALLOCATION, 'Exam hall allocation'),
+    ]
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    recipients = models.ManyToManyField(Student, related_name='email_jobs', blank=True)
+    total_count = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=list, blank=True, help_text='Per-student results of failed sends')
+    error = models.TextField(blank=True)
+    attempt = models.PositiveSmallIntegerField(default=1)
+    run_after = models.DateTimeField(null=True, blank=True, help_text='Not claimed by workers before this time')
+    cursor = models.JSONField(
+        null=True,
+        blank=True,
+        help_text='Checkpoint: last (branch, year, roll_number) processed and the counts up to it'
+    )
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='retries',
+        null=True,
+        blank=True
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='email_jobs',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Email Job'
+        verbose_name_plural = 'Email Jobs'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Email job #{self.pk} ({self.get_kind_display()}, {self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED)
+
+
+class RateLimitBucket(models.Model):
+    """Token-bucket state shared by every process that sends mail"""
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    refilled_at = models.FloatField(help_text='Unix timestamp of the last refill')
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Rate Limit Bucket'
+        verbose_name_plural = 'Rate Limit Buckets'
+
+    def __str__(self):
+        return f"{self.name} ({self.tokens:.1f} tokens)"
+
+
+class EmailTemplate(models.Model):
+    """Exam notice template the exam cell can edit from the admin without a deploy"""
+    name = models.CharField(max_length=50, unique=True)
+    subject = models.CharField(max_length=200)
+    text_body = models.TextField(help_text='Plain-text body (Django template syntax)')
+    html_body = models.TextField(blank=True, help_text='Optional HTML body sent as a multipart alternative')
+    is_active = models.BooleanField(default=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Email Template'
+        verbose_name_plural = 'Email Templates'
+
+    def __str__(self):
+        return f"{self.name} (v{self.version})"
+
+    def clean(self):
+        """Reject templates that would fail to compile at send time"""
+        engine = Engine()
+        for field in ('subject', 'text_body', 'html_body'):
+            try:
+                engine.from_string(getattr(self, field))
+            except TemplateSyntaxError as e:
+                raise ValidationError({field: f'Invalid template: {str(e)}'})
+
+    def save(self, *args, **kwargs):
+        # Every edit gets a new version so compiled copies cached by senders are replaced
+        if self.pk:
+            self.version += 1
+        super().save(*args, **kwargs)
+
+
+class EmailDelivery(models.Model):
+    """Ledger of exam notices delivered to a student, one row per distinct content"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='email_deliveries')
+    content_hash = models.CharField(max_length=64)
+    exam_hall_number = models.CharField(max_length=20, blank=True)
+    email = models.EmailField(max_length=254)
+    send_count = models.PositiveIntegerField(default=1)
+    first_sent_at = models.DateTimeField(auto_now_add=True)
+    last_sent_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-last_sent_at']
+        verbose_name = 'Email Delivery'
+        verbose_name_plural = 'Email Deliveries'
+        unique_together = ['student', 'content_hash']
+
+    def __str__(self):
+        return f"{self.student_id} - hall {self.exam_hall_number} ({self.send_count}x)"
+
+
+class EmailDeadLetter(models.Model):
+    """Exam notice that permanently failed or ran out of retries"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='email_dead_letters')
+    job = models.ForeignKey(
+        EmailJob,
+        on_delete=models.SET_NULL,
+        related_name='dead_letters',
+        null=True,
+        blank=True
+    )
+    email = models.CharField(max_length=254, blank=True)
+    exam_hall_number = models.CharField(max_length=20, blank=True)
+    error_class = models.CharField(max_length=100)
+    error_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Email Dead Letter'
+        verbose_name_plural = 'Email Dead Letters'
+        indexes = [
+            models.Index(fields=['error_class', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.error_class} after {self.attempts} attempt(s)"
+
+
+class ExamRoomUpload(models.Model):
+    """Fingerprint and outcome of an applied exam room seating file"""
+    content_hash = models.CharField(max_length=64, db_index=True, help_text='SHA-256 of the uploaded file')
+    file_name = models.CharField(max_length=255)
+    file_size = models.PositiveBigIntegerField(default=0)
+    added_count = models.PositiveIntegerField(default=0, help_text='Students who had no hall before')
+    changed_count = models.PositiveIntegerField(default=0, help_text='Students moved to a different hall')
+    unchanged_count = models.PositiveIntegerField(default=0, help_text='Students already in the uploaded hall')
+    not_found_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    email_job = models.ForeignKey(
+        EmailJob,
+        on_delete=models.SET_NULL,
+        related_name='uploads',
+        null=True,
+        blank=True
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='exam_room_uploads',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Exam Room Upload'
+        verbose_name_plural = 'Exam Room Uploads'
+
+    def __str__(self):
+        return f"{self.file_name} ({self.content_hash[:12]})"
+
+
+class Room(models.Model):
+    """Exam hall that students can be allocated to"""
+    number = models.CharField(max_length=20, unique=True, help_text='Stored as the students\' exam hall number')
+    capacity = models.PositiveIntegerField()
+    position = models.PositiveIntegerField(default=0, help_text='Rooms are filled in this order, then by number')
+    is_active = models.BooleanField(default=True, help_text='Only active rooms are used for allocation')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['position', 'number']
+        verbose_name = 'Room'
+        verbose_name_plural = 'Rooms'
+
+    def __str__(self):
+        return f"Room {self.number} ({self.capacity} seats)"
+
+
+class StudentStats(models.Model):
+    """Dashboard counts for one (branch, year), kept in sync with Student by students.statistics"""
+    branch = models.CharField(max_length=10, choices=Student.BRANCH_CHOICES)
+    year = models.CharField(max_length=1, choices=Student.YEAR_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    emails_sent = models.PositiveIntegerField(default=0)
+    with_room = models.PositiveIntegerField(default=0)
+    with_gmail = models.PositiveIntegerField(default=0)
+    ready_for_email = models.PositiveIntegerField(default=0)
+    missing_gmail = models.PositiveIntegerField(default=0)
+    missing_room = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['branch', 'year']
+        verbose_name = 'Student Statistics'
+        verbose_name_plural = 'Student Statistics'
+        unique_together = ['branch', 'year']
+
+    def __str__(self):
+        return f"{self.branch} {self.year}: {self.count} students"
@@ -0,0 +1,107 @@
+# students/querysets.py
+from django.db.models import BooleanField, Expression, F, Value
+
+# Roster order used by every bulk path; backed by the (branch, year, roll_number) unique index
+STUDENT_KEYSET = ('branch', 'year', 'roll_number')
+
+# Columns needed to render, send and record an exam notice
+EMAIL_FIELDS = (
+    'id', 'name', 'roll_number', 'branch', 'year',
+    'gmail_address', 'exam_hall_number', 'email_sent'
+)
+
+
+def filter_students(queryset, params):
+    """Apply the student list filters (roll_number, branch, year, hall_number, gmail) from `params`"""
+    roll_number = params.get('roll_number')
+    branch = params.get('branch')
+    year = params.get('year')
+    hall_number = params.get('hall_number')
+    gmail = params.get('gmail')
+
+    if roll_number:
+        queryset = queryset.filter(roll_number__icontains=roll_number)
+    if branch:
+        queryset = queryset.filter(branch=branch)
+    if year:
+        queryset = queryset.filter(year=year)
+    if hall_number:
+        queryset = queryset.filter(exam_hall_number=hall_number)
+    if gmail:
+        queryset = queryset.filter(gmail_address__icontains=gmail)
+
+    return queryset
+
+
+def student_key(student):
+    """Position of a student in roster order"""
+    return [student.branch, student.year, student.roll_number]
+
+
+class RowAfter(Expression):
+    """SQL row-value comparison `(a, b, c) > (x, y, z)`, usable directly in filter().
+
+    Unlike the equivalent OR of column comparisons, SQLite (3.15+), PostgreSQL
+    and MySQL all turn this into a range seek on a matching composite index.
+    """
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, fields, values):
+        super().__init__()
+        self.lhs = [F(field) for field in fields]
+        self.rhs = [Value(value) for value in values]
+
+    def get_source_expressions(self):
+        return [*self.lhs, *self.rhs]
+
+    def set_source_expressions(self, exprs):
+        self.lhs, self.rhs = exprs[:len(self.lhs)], exprs[len(self.lhs):]
+
+    def as_sql(self, compiler, connection):
+        sides = []
+        params = []
+        for side in (self.lhs, self.rhs):
+            parts = []
+            for expression in side:
+                sql, expression_params = compiler.compile(expression)
+                parts.append(sql)
+                params.extend(expression_params)
+            sides.append(f"({', '.join(parts)})")
+        return f'{sides[0]} > {sides[1]}', params
+
+
+def after_key(key):
+    """Filter for students strictly after `key` in (branch, year, roll_number) order"""
+    return RowAfter(STUDENT_KEYSET, key)
+
+
+def iter_keyset_chunks(queryset, chunk_size=500, after=None, fields=None):
+    """Yield lists of students in roster order, `chunk_size` at a time.
+
+    Each chunk is a fresh seek on the index past the last row of the previous
+    one, so the cost of a chunk does not depend on how many came before it,
+    and only one chunk of model instances is alive at once. `fields` limits
+    the columns fetched (the keyset columns are always included).
+    """
+    queryset = queryset.order_by(*STUDENT_KEYSET)
+    if fields:
+        queryset = queryset.only(*set(fields) | set(STUDENT_KEYSET))
+
+    while True:
+        page = queryset.filter(after_key(after)) if after else queryset
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+
+        yield chunk
+
+        if len(chunk) < chunk_size:
+            return
+        after = student_key(chunk[-1])
+
+
+def iter_keyset(queryset, chunk_size=500, fields=None):
+    """Iterate students one by one in roster order, fetched in keyset chunks"""
+    for chunk in iter_keyset_chunks(queryset, chunk_size, fields=fields):
+        yield from chunk
@@ -0,0 +1,80 @@
+# students/ratelimit.py
+from django.conf import settings
+from django.db import OperationalError
+from django.db.models import F
+from .models import RateLimitBucket
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often a reservation is retried when SQLite reports the bucket row as locked
+LOCKED_RETRIES = 50
+
+
+class TokenBucket:
+    """Token-bucket rate limiter whose state lives in the database.
+
+    Every process reserves tokens from the same RateLimitBucket row with a
+    compare-and-swap UPDATE on its version column, so parallel senders share
+    one quota instead of each assuming they own all of it. Reservations may
+    drive the balance negative; the caller then sleeps off its share of the
+    debt, which keeps waiters in arrival order without holding a lock.
+    """
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+
+    def reserve(self, tokens=1):
+        """Take tokens from the bucket and return how long to wait before using them"""
+        if self.rate <= 0:
+            return 0.0
+
+        locked_attempts = 0
+
+        while True:
+            now = time.time()
+            try:
+                bucket, created = RateLimitBucket.objects.get_or_create(
+                    name=self.name,
+                    defaults={'tokens': self.burst, 'refilled_at': now}
+                )
+
+                elapsed = max(0.0, now - bucket.refilled_at)
+                available = min(self.burst, bucket.tokens + elapsed * self.rate)
+                remaining = available - tokens
+
+                updated = RateLimitBucket.objects.filter(
+                    id=bucket.id,
+                    version=bucket.version
+                ).update(tokens=remaining, refilled_at=now, version=F('version') + 1)
+
+            except OperationalError:
+                # SQLite reports write contention as "database is locked"; back off and retry
+                locked_attempts += 1
+                if locked_attempts >= LOCKED_RETRIES:
+                    raise
+                time.sleep(random.uniform(0.005, 0.05))
+                continue
+
+            if updated:
+                return max(0.0, -remaining / self.rate)
+
+    def acquire(self, tokens=1):
+        """Block until the requested tokens are available"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            logger.debug(f"Rate limiter '{self.name}' waiting {wait:.2f}s")
+            time.sleep(wait)
+
+
+def get_email_rate_limiter():
+    """Return the limiter shared by every outgoing email"""
+    return TokenBucket(
+        'email',
+        rate=settings.EMAIL_RATE_LIMIT_PER_SECOND,
+        burst=settings.EMAIL_RATE_LIMIT_BURST
+    )
@@ -0,0 +1,77 @@
+# students/roster.py
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Student
+from .statistics import refresh_student_stats
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RosterImporter:
+    """Inserts new students and updates existing ones from validated roster records.
+
+    Students are matched on roll number, which is unique on its own, so the
+    (branch, year, roll_number) constraint holds for every upserted row. Each
+    chunk costs one IN lookup, one bulk_create and one bulk_update in its own
+    transaction. Empty optional cells (None) leave the current value alone.
+    """
+
+    def __init__(self, fields, chunk_size=None):
+        self.fields = list(fields)
+        self.chunk_size = chunk_size or settings.UPLOAD_APPLY_CHUNK_SIZE
+        self.created_count = 0
+        self.updated_count = 0
+        self.unchanged_count = 0
+
+    def apply(self, records):
+        """Upsert a list of student records in chunks"""
+        for start in range(0, len(records), self.chunk_size):
+            self.apply_chunk(records[start:start + self.chunk_size])
+        return self
+
+    def apply_chunk(self, records):
+        existing = {
+            student.roll_number: student
+            for student in Student.objects.filter(
+                roll_number__in=[record['roll_number'] for record in records]
+            ).only('id', 'branch', 'year', *self.fields)
+        }
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        groups = set()
+        for record in records:
+            student = existing.get(record['roll_number'])
+            if student is None:
+                to_create.append(Student(**record))
+                groups.add(to_create[-1].stats_group())
+                continue
+
+            group = student.stats_group()
+
+            changed = False
+            for field, value in record.items():
+                if value is not None and getattr(student, field) != value:
+                    setattr(student, field, value)
+                    changed = True
+
+            if changed:
+                student.updated_at = now
+                to_update.append(student)
+                groups.update((group, student.stats_group()))
+            else:
+                self.unchanged_count += 1
+
+        update_fields = [field for field in self.fields if field != 'roll_number'] + ['updated_at']
+        with transaction.atomic():
+            if to_create:
+                Student.objects.bulk_create(to_create)
+            if to_update:
+                Student.objects.bulk_update(to_update, update_fields)
+            refresh_student_stats(groups)
+
+        self.created_count += len(to_create)
+        self.updated_count += len(to_update)
@@ -1,6 +1,10 @@
 # students/serializers.py
 from rest_framework import serializers
-from .models import Student
+from django.conf import settings
+from django.urls import reverse
+from .models import Student, EmailJob, EmailDeadLetter, ExamRoomUpload, Room
+from .excel import read_excel, iter_excel_frames, is_wanted_column
+from .uploads import upload_source
 import pandas as pd
 
 class StudentSerializer(serializers.ModelSerializer):
@@ -56,12 +60,24 @@ class StudentCreateSerializer(serializers.ModelSerializer):
 class ExamRoomUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
     send_emails = serializers.BooleanField(default=True)
+    stream = serializers.BooleanField(
+        default=False,
+        help_text='Read and apply the file in chunks, reporting bad rows instead of rejecting the file'
+    )
+    force = serializers.BooleanField(
+        default=False,
+        help_text='Apply the file even if it is identical to the last applied upload'
+    )
+    preview = serializers.BooleanField(
+        default=False,
+        help_text='Only report what the upload would change and return a token to commit it'
+    )
     
     def validate_file(self, value):
         """Validate uploaded file format"""
-        if not value.name.endswith(('.xlsx', '.xls', '.csv')):
+        if not value.name.endswith(('.xlsx', '.xls', '.csv', '.zip')):
             raise serializers.ValidationError(
-                "Only Excel (.xlsx, .xls) and CSV files are allowed."
+                "Only Excel (.xlsx, .xls), CSV and zip files are allowed."
             )
         return value
     
@@ -70,63 +86,15 @@ class ExamRoomUploadSerializer(serializers.Serializer):
         try:
             # Read file based on extension
             if file.name.endswith('.csv'):
-                df = pd.read_csv(file)
+                # Only a spooled temp file can be memory-mapped; in-memory uploads have no fileno
+                source = upload_source(file)
+                df = pd.read_csv(source, memory_map=isinstance(source, str))
             else:
-                df = pd.read_excel(file)
-            
-            # Expected columns: S.No, Roll No, Room No
-            expected_columns = ['S.No', 'Roll No', 'Room No']
-            
-            # Check if all required columns are present (case insensitive)
-            df_columns = [col.strip() for col in df.columns]
-            missing_columns = []
-            column_mapping = {}
+                df = read_excel(file)
             
-            for expected_col in expected_columns:
-                found = False
-                for df_col in df_columns:
-                    if df_col.lower() == expected_col.lower():
-                        column_mapping[expected_col] = df_col
-                        found = True
-                        break
-                if not found:
-                    missing_columns.append(expected_col)
+            df = self.map_columns(df)
             
-            if missing_columns:
-                raise serializers.ValidationError(
-                    f"Missing required columns: {', '.join(missing_columns)}. "
-                    f"Expected columns: {', '.join(expected_columns)}"
-                )
-            
-            # Rename columns to standard format
-            df = df.rename(columns={
-                column_mapping['S.No']: 'sno',
-                column_mapping['Roll No']: 'roll_number',
-                column_mapping['Room No']: 'room_number'
-            })
-            
-            # Clean and validate data
-            df = df.dropna(subset=['roll_number', 'room_number'])
-            
-            processed_data = []
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    roll_number = str(row['roll_number']).strip().upper()
-                    room_number = str(row['room_number']).strip()
-                    
-                    if not roll_number or not room_number:
-                        errors.append(f"Row {index + 2}: Roll number and room number cannot be empty")
-                        continue
-                    
-                    processed_data.append({
-                        'roll_number': roll_number,
-                        'room_number': room_number
-                    })
-                    
-                except Exception as e:
-                    errors.append(f"Row {index + 2}: {str(e)}")
+            processed_data, errors = self.clean_rows(df)
             
             if errors:
                 raise serializers.ValidationError({
@@ -140,6 +108,258 @@ class ExamRoomUploadSerializer(serializers.Serializer):
             if isinstance(e, serializers.ValidationError):
                 raise e
             raise serializers.ValidationError(f"Error processing file: {str(e)}")
+    
+    def iter_chunks(self, file, chunk_size=None):
+        """Yield (records, row errors) for an upload, one chunk of rows at a time.
+        
+        CSV files are memory-mapped when spooled to a temp file and read
+        `chunk_size` rows at a time so memory stays flat
+        however large the file is; .xlsx files are streamed the same way when
+        the openpyxl engine is in use. Unlike process_file, row errors are
+        returned rather than raised so the caller can keep going.
+        """
+        chunk_size = chunk_size or settings.UPLOAD_STREAM_CHUNK_SIZE
+        try:
+            if file.name.endswith('.csv'):
+                source = upload_source(file)
+                chunks = pd.read_csv(source, chunksize=chunk_size, memory_map=isinstance(source, str))
+            else:
+                chunks = iter_excel_frames(file, chunk_size)
+            
+            for df in chunks:
+                # The index keeps counting across chunks, so row numbers stay file-wide
+                yield self.clean_rows(self.map_columns(df))
+                
+        except Exception as e:
+            if isinstance(e, serializers.ValidationError):
+                raise e
+            raise serializers.ValidationError(f"Error processing file: {str(e)}")
+    
+    def map_columns(self, df):
+        """Check the required columns and rename them to sno, roll_number, room_number"""
+        # Expected columns: S.No, Roll No, Room No
+        expected_columns = ['S.No', 'Roll No', 'Room No']
+        
+        # Check if all required columns are present (case insensitive)
+        df_columns = [col.strip() for col in df.columns]
+        missing_columns = []
+        column_mapping = {}
+        
+        for expected_col in expected_columns:
+            found = False
+            for df_col in df_columns:
+                if df_col.lower() == expected_col.lower():
+                    column_mapping[expected_col] = df_col
+                    found = True
+                    break
+            if not found:
+                missing_columns.append(expected_col)
+        
+        if missing_columns:
+            raise serializers.ValidationError(
+                f"Missing required columns: {', '.join(missing_columns)}. "
+                f"Expected columns: {', '.join(expected_columns)}"
+            )
+        
+        # Rename columns to standard format
+        return df.rename(columns={
+            column_mapping['S.No']: 'sno',
+            column_mapping['Roll No']: 'roll_number',
+            column_mapping['Room No']: 'room_number'
+        })
+    
+    def clean_rows(self, df):
+        """Normalise roll/room columns and return (records, row errors).
+        
+        Works on whole columns instead of row by row; error messages keep the
+        spreadsheet row number (index + 2: one header row, 1-based rows).
+        """
+        df = df.dropna(subset=['roll_number', 'room_number'])
+        
+        roll_numbers = df['roll_number'].astype(str).str.strip().str.upper()
+        room_numbers = df['room_number'].astype(str).str.strip()
+        
+        empty = (roll_numbers == '') | (room_numbers == '')
+        errors = [
+            f"Row {index + 2}: Roll number and room number cannot be empty"
+            for index in df.index[empty]
+        ]
+        
+        processed_data = [
+            {'roll_number': roll_number, 'room_number': room_number}
+            for roll_number, room_number in zip(roll_numbers[~empty], room_numbers[~empty])
+        ]
+        return processed_data, errors
+
+class HallAllocationSerializer(serializers.Serializer):
+    # Same filters as the student list endpoint
+    roll_number = serializers.CharField(required=False, allow_blank=True)
+    branch = serializers.ChoiceField(choices=Student.BRANCH_CHOICES, required=False, allow_blank=True)
+    year = serializers.ChoiceField(choices=Student.YEAR_CHOICES, required=False, allow_blank=True)
+    hall_number = serializers.CharField(required=False, allow_blank=True)
+    gmail = serializers.CharField(required=False, allow_blank=True)
+    
+    rooms = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        help_text='Room numbers to fill, in order of their position; all active rooms by default'
+    )
+    interleave_branches = serializers.BooleanField(default=False)
+    send_emails = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
+    
+    def validate_rooms(self, value):
+        """Validate that all rooms exist"""
+        existing = set(Room.objects.filter(number__in=value).values_list('number', flat=True))
+        missing = [number for number in value if number not in existing]
+        
+        if missing:
+            raise serializers.ValidationError(f"Rooms {missing} do not exist.")
+        return value
+
+class StudentRosterImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    
+    # Accepted headers for each field (case insensitive); the admin CSV export's headers work too
+    COLUMNS = {
+        'roll_number': ('roll number', 'roll no'),
+        'name': ('name',),
+        'branch': ('branch',),
+        'year': ('year',),
+        'gmail_address': ('gmail address', 'gmail'),
+        'phone_number': ('phone number', 'phone'),
+        'exam_hall_number': ('exam hall number', 'room no'),
+    }
+    REQUIRED_FIELDS = ('roll_number', 'name', 'branch', 'year')
+    
+    def validate_file(self, value):
+        """Validate uploaded file format"""
+        if not value.name.endswith(('.xlsx', '.xls', '.csv')):
+            raise serializers.ValidationError(
+                "Only Excel (.xlsx, .xls) and CSV files are allowed."
+            )
+        return value
+    
+    def process_file(self, file):
+        """Read a roster file and return (records, row errors, fields present in the file)"""
+        headers = tuple(header for names in self.COLUMNS.values() for header in names)
+        try:
+            if file.name.endswith('.csv'):
+                source = upload_source(file)
+                df = pd.read_csv(
+                    source,
+                    usecols=lambda name: is_wanted_column(name, headers),
+                    dtype=str,
+                    keep_default_na=False,
+                    memory_map=isinstance(source, str)
+                )
+            else:
+                df = read_excel(file, columns=headers)
+            
+            return self.clean_rows(self.map_columns(df))
+            
+        except Exception as e:
+            if isinstance(e, serializers.ValidationError):
+                raise e
+            raise serializers.ValidationError(f"Error processing file: {str(e)}")
+    
+    def map_columns(self, df):
+        """Rename recognised headers to field names and turn every cell into a stripped string"""
+        rename = {}
+        for field, names in self.COLUMNS.items():
+            for column in df.columns:
+                if str(column).strip().lower() in names:
+                    rename[column] = field
+                    break
+        
+        missing_fields = [field for field in self.REQUIRED_FIELDS if field not in rename.values()]
+        if missing_fields:
+            raise serializers.ValidationError(
+                f"Missing required columns: {', '.join(self.COLUMNS[field][0].title() for field in missing_fields)}. "
+                f"Expected columns: Roll Number, Name, Branch, Year "
+                f"(optional: Gmail Address, Phone Number, Exam Hall Number)"
+            )
+        
+        df = df[list(rename)].rename(columns=rename).fillna('').astype(str)
+        for field in df.columns:
+            df[field] = df[field].str.strip()
+        
+        # Numeric Excel cells can come back as floats
+        for field in ('year', 'phone_number'):
+            if field in df.columns:
+                df[field] = df[field].str.replace(r'\.0$', '', regex=True)
+        return df
+    
+    def clean_rows(self, df):
+        """Validate the roster columns at once and return (records, row errors, fields).
+        
+        Every failed check is reported against its spreadsheet row
+        (index + 2); rows with any error are left out of the records.
+        """
+        # Skip completely empty lines
+        df = df[(df != '').any(axis=1)]
+        
+        branch_codes = {code: code for code, _ in Student.BRANCH_CHOICES}
+        branch_codes.update({label.upper(): code for code, label in Student.BRANCH_CHOICES})
+        year_codes = {code: code for code, _ in Student.YEAR_CHOICES}
+        year_codes.update({label.upper(): code for code, label in Student.YEAR_CHOICES})
+        
+        roll_number = df['roll_number'].str.upper()
+        branch = df['branch'].str.upper().map(branch_codes)
+        year = df['year'].str.upper().map(year_codes)
+        
+        checks = [
+            (roll_number == '', 'Roll number is required'),
+            ((roll_number != '') & ~roll_number.str.fullmatch(r'[A-Z0-9]+'), 'Roll number must be alphanumeric'),
+            (roll_number.str.len() > 20, 'Roll number must be at most 20 characters'),
+            ((roll_number != '') & roll_number.duplicated(), 'Roll number appears more than once in the file'),
+            (df['name'] == '', 'Name is required'),
+            (df['name'].str.len() > 100, 'Name must be at most 100 characters'),
+            (branch.isna(), f"Invalid branch. Choose from: {', '.join(code for code, _ in Student.BRANCH_CHOICES)}"),
+            (year.isna(), f"Invalid year. Choose from: {', '.join(code for code, _ in Student.YEAR_CHOICES)}"),
+        ]
+        
+        data = {'roll_number': roll_number, 'name': df['name'], 'branch': branch, 'year': year}
+        
+        if 'gmail_address' in df.columns:
+            gmail = df['gmail_address'].str.lower()
+            checks.append((
+                (gmail != '') & ~gmail.str.fullmatch(r'[^@\s]+@gmail\.com'),
+                'Please provide a valid Gmail address ending with @gmail.com'
+            ))
+            data['gmail_address'] = gmail
+        if 'phone_number' in df.columns:
+            phone = df['phone_number']
+            checks.append(((phone != '') & ~phone.str.fullmatch(r'\+?1?\d{9,15}'), 'Phone number must be 9-15 digits'))
+            data['phone_number'] = phone
+        if 'exam_hall_number' in df.columns:
+            hall = df['exam_hall_number']
+            checks.append((hall.str.len() > 20, 'Exam hall number must be at most 20 characters'))
+            data['exam_hall_number'] = hall
+        
+        row_errors = {}
+        invalid = pd.Series(False, index=df.index)
+        for mask, message in checks:
+            invalid |= mask
+            for index in df.index[mask]:
+                row_errors.setdefault(index, []).append(message)
+        
+        errors = [
+            f"Row {index + 2}: {'; '.join(messages)}"
+            for index, messages in sorted(row_errors.items())
+        ]
+        
+        # Blank optional cells become None so they never overwrite existing values
+        valid = pd.DataFrame(data)[~invalid]
+        records = [
+            {field: value if value != '' else None for field, value in row.items()}
+            for row in valid.to_dict('records')
+        ]
+        return records, errors, list(data)
+
+class ExamRoomCommitSerializer(serializers.Serializer):
+    token = serializers.CharField(max_length=64)
+    send_emails = serializers.BooleanField(default=True)
 
 class BulkEmailSerializer(serializers.Serializer):
     student_ids = serializers.ListField(
@@ -156,4 +376,54 @@ class BulkEmailSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 f"Students with IDs {list(missing_ids)} do not exist."
             )
-        return value
\ No newline at end of file
+        return value
+
+class EmailJobSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    is_finished = serializers.ReadOnlyField()
+    progress_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = EmailJob
+        fields = [
+            'id', 'kind', 'kind_display', 'status', 'status_display', 'is_finished',
+            'total_count', 'sent_count', 'failed_count', 'results', 'error',
+            'attempt', 'run_after', 'parent', 'cursor', 'heartbeat_at', 'progress_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+    
+    def get_progress_url(self, obj):
+        return reverse('students:email-job-progress', args=[obj.id])
+
+class EmailDeadLetterSerializer(serializers.ModelSerializer):
+    roll_number = serializers.CharField(source='student.roll_number', read_only=True)
+    name = serializers.CharField(source='student.name', read_only=True)
+    
+    class Meta:
+        model = EmailDeadLetter
+        fields = [
+            'id', 'student', 'roll_number', 'name', 'job', 'email', 'exam_hall_number',
+            'error_class', 'error_code', 'error_message', 'attempts', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class ExamRoomUploadRecordSerializer(serializers.ModelSerializer):
+    uploaded_by = serializers.CharField(source='uploaded_by.username', read_only=True, default=None)
+    
+    class Meta:
+        model = ExamRoomUpload
+        fields = [
+            'id', 'content_hash', 'file_name', 'file_size', 'added_count', 'changed_count',
+            'unchanged_count', 'not_found_count', 'error_count', 'email_job', 'uploaded_by', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class RoomSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Room
+        fields = ['id', 'number', 'capacity', 'position', 'is_active', 'created_at']
+        read_only_fields = ['id', 'created_at']
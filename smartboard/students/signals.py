@@ -0,0 +1,24 @@
+# students/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Student
+from .statistics import refresh_student_stats, signal_refresh_suspended
+
+
+@receiver(post_save, sender=Student)
+def refresh_stats_on_save(sender, instance, raw=False, **kwargs):
+    """Refresh the StudentStats rows of the student's group, and of its old group if it moved"""
+    if raw or signal_refresh_suspended():
+        return
+
+    group = (instance.branch, instance.year)
+    refresh_student_stats({group, getattr(instance, '_stats_group', None)})
+    instance._stats_group = group
+
+
+@receiver(post_delete, sender=Student)
+def refresh_stats_on_delete(sender, instance, **kwargs):
+    """Refresh the StudentStats row of a deleted student's group"""
+    if signal_refresh_suspended():
+        return
+    refresh_student_stats({(instance.branch, instance.year)})
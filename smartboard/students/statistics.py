@@ -0,0 +1,277 @@
+# students/statistics.py
+"""Dashboard statistics for get_statistics.
+
+Counts are kept per (branch, year) in the StudentStats table and rolled up
+to branch and global totals in Python; the student lists come from one
+ordered scan. Every write to Student refreshes the rows of the groups it
+touched: single saves and deletes through signals, bulk writes by calling
+refresh_student_stats themselves. A refresh recomputes its groups with one
+grouped query over conditional aggregates, so it is exact rather than a
+running delta, and reconcile_student_stats recomputes every group to fix
+any drift. The conditions mirror the original per-metric querysets
+exactly, including their NULL handling: exclude(gmail_address='') counts
+students with no Gmail address at all.
+"""
+from django.db.models import Count, Q
+from .models import Student, StudentStats
+from .querysets import STUDENT_KEYSET
+from contextlib import contextmanager
+from functools import reduce
+import logging
+import operator
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Per-thread switch the save/delete signals check before refreshing row by row
+_bulk_refresh = threading.local()
+
+COUNT_FIELDS = (
+    'count', 'emails_sent', 'with_room', 'with_gmail',
+    'ready_for_email', 'missing_gmail', 'missing_room'
+)
+
+# Ready for email: both present, not sent yet, and not both empty strings
+READY_FOR_EMAIL = Q(
+    gmail_address__isnull=False,
+    exam_hall_number__isnull=False,
+    email_sent=False
+) & ~Q(gmail_address='', exam_hall_number='')
+MISSING_GMAIL = Q(gmail_address__isnull=True) | Q(gmail_address='')
+MISSING_ROOM = Q(exam_hall_number__isnull=True) | Q(exam_hall_number='')
+
+GROUP_AGGREGATES = {
+    'count': Count('id'),
+    'emails_sent': Count('id', filter=Q(email_sent=True)),
+    'with_room': Count('id', filter=~Q(exam_hall_number='')),
+    'with_gmail': Count('id', filter=~Q(gmail_address='')),
+    'ready_for_email': Count('id', filter=READY_FOR_EMAIL),
+    'missing_gmail': Count('id', filter=MISSING_GMAIL),
+    'missing_room': Count('id', filter=MISSING_ROOM),
+}
+
+
+def is_ready_for_email(student):
+    return (
+        student.gmail_address is not None
+        and student.exam_hall_number is not None
+        and not student.email_sent
+        and not (student.gmail_address == '' and student.exam_hall_number == '')
+    )
+
+
+def is_missing_gmail(student):
+    return not student.gmail_address
+
+
+def is_missing_room(student):
+    return not student.exam_hall_number
+
+
+def group_counts(queryset=None):
+    """Return {(branch, year): counts} from one grouped query"""
+    if queryset is None:
+        queryset = Student.objects.all()
+
+    rows = queryset.order_by().values('branch', 'year').annotate(**GROUP_AGGREGATES)
+    return {
+        (row['branch'], row['year']): {field: row[field] for field in COUNT_FIELDS}
+        for row in rows
+    }
+
+
+def stored_counts():
+    """Return {(branch, year): counts} from the StudentStats table"""
+    return {
+        (row['branch'], row['year']): {field: row[field] for field in COUNT_FIELDS}
+        for row in StudentStats.objects.values('branch', 'year', *COUNT_FIELDS)
+    }
+
+
+def student_groups(queryset):
+    """(branch, year) groups of a queryset, to refresh after updating it"""
+    return set(queryset.order_by().values_list('branch', 'year').distinct())
+
+
+def refresh_student_stats(groups):
+    """Recompute the StudentStats rows of the given (branch, year) groups"""
+    groups = {group for group in groups if group is not None}
+    if not groups:
+        return
+
+    condition = reduce(operator.or_, (Q(branch=branch, year=year) for branch, year in groups))
+    counts = group_counts(Student.objects.filter(condition))
+    save_student_stats(
+        {group: counts.get(group, dict.fromkeys(COUNT_FIELDS, 0)) for group in groups}
+    )
+
+
+def signal_refresh_suspended():
+    """Whether a bulk write on this thread will refresh the stats itself"""
+    return getattr(_bulk_refresh, 'active', False)
+
+
+@contextmanager
+def bulk_stats_refresh(queryset):
+    """Refresh the groups of `queryset` once after a bulk write instead of once per row.
+
+    The groups are read before the block runs, and the per-row signal
+    refreshes are skipped while it does.
+    """
+    groups = student_groups(queryset)
+    previous = signal_refresh_suspended()
+    _bulk_refresh.active = True
+    try:
+        yield
+    finally:
+        _bulk_refresh.active = previous
+    refresh_student_stats(groups)
+
+
+def save_student_stats(counts):
+    """Upsert {(branch, year): counts} into StudentStats with one INSERT"""
+    StudentStats.objects.bulk_create(
+        [StudentStats(branch=branch, year=year, **group) for (branch, year), group in counts.items()],
+        update_conflicts=True,
+        unique_fields=['branch', 'year'],
+        update_fields=[*COUNT_FIELDS, 'updated_at']
+    )
+
+
+def reconcile_student_stats(dry_run=False):
+    """Recompute every group from Student and return the groups whose stored counts had drifted"""
+    counts = group_counts()
+    stored = stored_counts()
+
+    # Groups left without students keep a row of zeros
+    for group in stored:
+        counts.setdefault(group, dict.fromkeys(COUNT_FIELDS, 0))
+
+    drifted = sorted(group for group, fresh in counts.items() if stored.get(group) != fresh)
+    if drifted and not dry_run:
+        save_student_stats({group: counts[group] for group in drifted})
+        logger.info(f"Reconciled student statistics for {len(drifted)} group(s)")
+    return drifted
+
+
+def listed_students():
+    """Students that appear in the dashboard lists, in roster order, from one scan"""
+    return Student.objects.filter(READY_FOR_EMAIL | MISSING_GMAIL | MISSING_ROOM).order_by(
+        *STUDENT_KEYSET
+    ).only(
+        'id', 'roll_number', 'name', 'branch', 'year',
+        'gmail_address', 'exam_hall_number', 'email_sent'
+    )
+
+
+def build_statistics(counts, students):
+    """Assemble the get_statistics payload from per-(branch, year) counts and listed students"""
+    totals = dict.fromkeys(COUNT_FIELDS, 0)
+    for group in counts.values():
+        for field in COUNT_FIELDS:
+            totals[field] += group[field]
+
+    branches_stats = {}
+    for branch_code, branch_name in Student.BRANCH_CHOICES:
+        branch_groups = {year: counts[(branch_code, year)] for year, _ in Student.YEAR_CHOICES
+                         if (branch_code, year) in counts}
+        branch_totals = {
+            field: sum(group[field] for group in branch_groups.values())
+            for field in COUNT_FIELDS
+        }
+        if not branch_totals['count']:
+            continue
+
+        branches_stats[branch_code] = {
+            'name': branch_name,
+            **branch_totals,
+            'pending_email_students': [],
+            'years': {}
+        }
+
+        for year_code, year_name in Student.YEAR_CHOICES:
+            group = branch_groups.get(year_code)
+            if not group or not group['count']:
+                continue
+
+            branches_stats[branch_code]['years'][year_code] = {
+                'name': year_name,
+                'count': group['count'],
+                'emails_sent': group['emails_sent'],
+                'emails_pending': group['count'] - group['emails_sent'],
+                'with_room': group['with_room'],
+                'with_gmail': group['with_gmail'],
+                'ready_for_email': group['ready_for_email'],
+                'missing_gmail': group['missing_gmail'],
+                'missing_room': group['missing_room'],
+                'pending_email_students': [],
+                'missing_gmail_students': [],
+                'missing_room_students': []
+            }
+
+    global_pending = []
+    for student in students:
+        branch_stats = branches_stats.get(student.branch)
+        year_stats = branch_stats['years'].get(student.year) if branch_stats else None
+
+        if is_ready_for_email(student):
+            global_pending.append({
+                'id': student.id,
+                'roll_number': student.roll_number,
+                'name': student.name,
+                'branch': student.branch,
+                'year': student.year,
+                'gmail_address': student.gmail_address,
+                'exam_hall_number': student.exam_hall_number
+            })
+            if branch_stats:
+                branch_stats['pending_email_students'].append({
+                    'id': student.id,
+                    'roll_number': student.roll_number,
+                    'name': student.name,
+                    'gmail_address': student.gmail_address,
+                    'exam_hall_number': student.exam_hall_number,
+                    'year': student.year
+                })
+            if year_stats:
+                year_stats['pending_email_students'].append({
+                    'id': student.id,
+                    'roll_number': student.roll_number,
+                    'name': student.name,
+                    'gmail_address': student.gmail_address,
+                    'exam_hall_number': student.exam_hall_number
+                })
+
+        if year_stats and is_missing_gmail(student):
+            year_stats['missing_gmail_students'].append({
+                'id': student.id,
+                'roll_number': student.roll_number,
+                'name': student.name,
+                'exam_hall_number': student.exam_hall_number or 'Not assigned'
+            })
+
+        if year_stats and is_missing_room(student):
+            year_stats['missing_room_students'].append({
+                'id': student.id,
+                'roll_number': student.roll_number,
+                'name': student.name,
+                'gmail_address': student.gmail_address or 'Not provided'
+            })
+
+    return {
+        'total_students': totals['count'],
+        'students_with_gmail': totals['with_gmail'],
+        'students_with_room': totals['with_room'],
+        'emails_sent': totals['emails_sent'],
+        'emails_pending': totals['count'] - totals['emails_sent'],
+        'students_ready_for_email': totals['ready_for_email'],
+        'students_missing_gmail': totals['missing_gmail'],
+        'students_missing_room': totals['missing_room'],
+        'branches_statistics': branches_stats,
+        'global_pending_email_students': global_pending
+    }
+
+
+def get_statistics_data():
+    """Dashboard statistics: counts from StudentStats plus one scan for the student lists"""
+    return build_statistics(stored_counts(), listed_students().iterator(chunk_size=2000))
@@ -1,3 +1,325 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from unittest import mock
+from .admin import StudentAdmin
+from .allocation import allocate_exam_halls
+from .jobs import claim_next_job, enqueue_email_job, requeue_stale_jobs, run_email_job
+from .mailer import send_bulk_emails
+from .models import Student, Room, EmailDelivery, EmailJob, ExamRoomUpload
+from .roster import RosterImporter
+from .uploads import ExamRoomApplier
+from .statistics import group_counts, reconcile_student_stats
+from . import jobs
 
-# Create your tests here.
+
+class AllocateExamHallsTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Student.objects.create(name=f'Student {i}', roll_number=f'ROLL{i}', branch='CSE', year='1')
+
+    def test_zero_capacity_room_is_skipped(self):
+        Room.objects.create(number='A', capacity=0, position=0)
+        Room.objects.create(number='B', capacity=10, position=1)
+
+        summary, changed_ids = allocate_exam_halls(Student.objects.all())
+
+        self.assertEqual(summary['allocated_count'], 5)
+        self.assertEqual(summary['rooms_used'], 1)
+        self.assertEqual(summary['rooms'], [{'room': 'B', 'capacity': 10, 'occupied': 0, 'allocated': 5}])
+        self.assertEqual(len(changed_ids), 5)
+        self.assertEqual(Student.objects.filter(exam_hall_number='B').count(), 5)
+
+    def test_seats_taken_outside_the_selection_are_kept(self):
+        for i in range(3):
+            Student.objects.create(name=f'ECE {i}', roll_number=f'ECE{i}', branch='ECE', year='1')
+        Room.objects.create(number='A', capacity=4, position=0)
+        Room.objects.create(number='B', capacity=4, position=1)
+
+        allocate_exam_halls(Student.objects.filter(branch='CSE'))
+        summary, _ = allocate_exam_halls(Student.objects.filter(branch='ECE'))
+
+        self.assertEqual(summary['rooms'], [
+            {'room': 'B', 'capacity': 4, 'occupied': 1, 'allocated': 3},
+        ])
+        self.assertEqual(Student.objects.filter(exam_hall_number='A').count(), 4)
+        self.assertEqual(Student.objects.filter(exam_hall_number='B').count(), 4)
+
+    def test_occupied_seats_count_against_free_seats(self):
+        Room.objects.create(number='A', capacity=6)
+        allocate_exam_halls(Student.objects.all())
+        Student.objects.create(name='Late', roll_number='LATE1', branch='ECE', year='1')
+        Student.objects.create(name='Late', roll_number='LATE2', branch='ECE', year='1')
+
+        with self.assertRaisesMessage(ValueError, 'rooms have 1 free'):
+            allocate_exam_halls(Student.objects.filter(branch='ECE'))
+
+
+class DeliveryLedgerTests(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create(
+            name='Student', roll_number='ROLL1', branch='CSE', year='1',
+            gmail_address='student@gmail.com', exam_hall_number='204'
+        )
+
+    def send(self):
+        return send_bulk_emails(Student.objects.all(), workers=1)[0]
+
+    def move_to(self, hall):
+        self.student.exam_hall_number = hall
+        self.student.email_sent = False
+        self.student.save()
+
+    def test_same_content_is_skipped(self):
+        self.send()
+        result = self.send()
+
+        self.assertTrue(result['skipped'])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_moving_back_to_an_earlier_hall_notifies_again(self):
+        self.send()
+        self.move_to('305')
+        self.send()
+        self.move_to('204')
+        result = self.send()
+
+        self.assertTrue(result['success'])
+        self.assertNotIn('skipped', result)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn('204', mail.outbox[-1].body)
+        self.assertEqual(EmailDelivery.objects.filter(student=self.student).count(), 2)
+
+
+@override_settings(EMAIL_JOB_CHUNK_SIZE=2, EMAIL_SEND_WORKERS=1)
+class EmailJobTests(TestCase):
+    def setUp(self):
+        for i in range(6):
+            Student.objects.create(
+                name=f'Student {i}', roll_number=f'ROLL{i}', branch='CSE', year='1',
+                # ROLL0 has no Gmail address, so the first chunk records one failure
+                gmail_address=f'student{i}@gmail.com' if i else None, exam_hall_number='101'
+            )
+        self.job = enqueue_email_job(EmailJob.KIND_BULK, Student.objects.all())
+
+    def run_failing_on_second_chunk(self):
+        calls = []
+
+        def send(chunk, **kwargs):
+            calls.append(chunk)
+            if len(calls) == 2:
+                raise OperationalError('database is locked')
+            return send_bulk_emails(chunk, **kwargs)
+
+        with mock.patch.object(jobs, 'send_bulk_emails', side_effect=send):
+            return run_email_job(claim_next_job())
+
+    def test_claim_is_exclusive(self):
+        job = claim_next_job()
+
+        self.assertEqual(job.id, self.job.id)
+        self.assertEqual(job.status, EmailJob.STATUS_RUNNING)
+        self.assertIsNone(claim_next_job())
+
+    def test_completed_run(self):
+        job = run_email_job(claim_next_job())
+
+        self.assertEqual(job.status, EmailJob.STATUS_COMPLETED)
+        self.assertEqual((job.sent_count, job.failed_count), (5, 1))
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_error_requeues_and_resumes_from_cursor(self):
+        job = self.run_failing_on_second_chunk()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, EmailJob.STATUS_QUEUED)
+        self.assertEqual(job.cursor['key'], ['CSE', '1', 'ROLL1'])
+        self.assertEqual((job.sent_count, job.failed_count, len(job.results)), (1, 1, 1))
+        # Backed off, so not claimable straight away
+        self.assertIsNone(claim_next_job())
+
+        EmailJob.objects.filter(id=job.id).update(run_after=None)
+        job = run_email_job(claim_next_job())
+
+        self.assertEqual(job.status, EmailJob.STATUS_COMPLETED)
+        self.assertEqual((job.sent_count, job.failed_count, len(job.results)), (5, 1, 1))
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_JOB_MAX_RESUMES=0)
+    def test_failure_keeps_the_checkpoint(self):
+        job = self.run_failing_on_second_chunk()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, EmailJob.STATUS_FAILED)
+        self.assertEqual(job.error, 'database is locked')
+        self.assertEqual((job.sent_count, job.failed_count, len(job.results)), (1, 1, 1))
+        self.assertEqual(job.cursor['sent'], 1)
+
+    def test_stale_job_is_requeued(self):
+        job = claim_next_job()
+        EmailJob.objects.filter(id=job.id).update(heartbeat_at=job.heartbeat_at - timedelta(hours=1))
+
+        self.assertEqual(requeue_stale_jobs(600), 1)
+        self.assertEqual(claim_next_job().id, job.id)
+
+
+class StudentStatsSyncTests(TestCase):
+    def setUp(self):
+        for i in range(6):
+            Student.objects.create(
+                name=f'Student {i}', roll_number=f'ROLL{i}', branch='CSE' if i % 2 else 'ECE', year='1',
+                gmail_address=f'student{i}@gmail.com', exam_hall_number='101'
+            )
+
+    def assertInSync(self):
+        self.assertEqual(reconcile_student_stats(dry_run=True), [])
+
+    def test_signal_saves_and_moves(self):
+        student = Student.objects.get(roll_number='ROLL0')
+        student.exam_hall_number = ''
+        student.save()
+        self.assertInSync()
+
+        student.branch = 'ME'
+        student.year = '4'
+        student.save()
+        self.assertInSync()
+
+        student.delete()
+        self.assertInSync()
+
+    def test_bulk_send(self):
+        send_bulk_emails(Student.objects.filter(branch='CSE'), workers=1)
+
+        self.assertEqual(Student.objects.filter(email_sent=True).count(), 3)
+        self.assertInSync()
+
+    def test_individual_send(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('staff', password='staff'))
+        student = Student.objects.get(roll_number='ROLL1')
+
+        response = client.post(f'/api/students/{student.id}/send-email/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertInSync()
+
+    def test_exam_room_applier(self):
+        ExamRoomApplier().apply([
+            {'roll_number': 'ROLL0', 'room_number': '202'},
+            {'roll_number': 'ROLL1', 'room_number': '101'},
+        ])
+        self.assertInSync()
+
+    def test_roster_importer(self):
+        RosterImporter(['roll_number', 'name', 'branch', 'year']).apply([
+            {'roll_number': 'ROLL0', 'name': 'Moved', 'branch': 'CIV', 'year': '2'},
+            {'roll_number': 'NEW1', 'name': 'New', 'branch': 'EEE', 'year': '3'},
+        ])
+        self.assertInSync()
+
+    def test_allocation(self):
+        Room.objects.create(number='R1', capacity=10)
+
+        allocate_exam_halls(Student.objects.filter(branch='CSE'))
+
+        self.assertEqual(Student.objects.filter(exam_hall_number='R1').count(), 3)
+        self.assertInSync()
+
+    def test_admin_actions(self):
+        admin = StudentAdmin(Student, site)
+
+        with mock.patch.object(StudentAdmin, 'message_user'):
+            admin.mark_email_sent(None, Student.objects.filter(branch='CSE'))
+            self.assertInSync()
+            admin.mark_email_pending(None, Student.objects.filter(roll_number='ROLL1'))
+            self.assertInSync()
+            admin.clear_exam_halls(None, Student.objects.filter(branch='ECE'))
+            self.assertInSync()
+
+    def test_admin_delete_refreshes_once(self):
+        admin = StudentAdmin(Student, site)
+
+        with mock.patch('students.statistics.group_counts', wraps=group_counts) as counted:
+            admin.delete_queryset(None, Student.objects.filter(roll_number__in=['ROLL0', 'ROLL1', 'ROLL2']))
+
+        self.assertEqual(counted.call_count, 1)
+        self.assertEqual(Student.objects.count(), 3)
+        self.assertInSync()
+
+
+class ExamRoomUploadTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Student.objects.create(name=f'Student {i}', roll_number=f'ROLL{i}', branch='CSE', year='1')
+        self.user = User.objects.create_user('staff', password='staff')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.content = b'S.No,Roll No,Room No\n1,ROLL0,101\n2,ROLL1,102\n3,UNKNOWN,103\n'
+
+    def upload(self, **data):
+        data.setdefault('send_emails', False)
+        return self.client.post('/api/students/upload-rooms/', {
+            'file': SimpleUploadedFile('rooms.csv', self.content), **data
+        }, format='multipart')
+
+    def halls(self):
+        return dict(Student.objects.values_list('roll_number', 'exam_hall_number'))
+
+    def test_upload_applies_and_records(self):
+        response = self.upload()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['added_count'], 2)
+        self.assertEqual(response.data['not_found_roll_numbers'], ['UNKNOWN'])
+        self.assertEqual(self.halls(), {'ROLL0': '101', 'ROLL1': '102', 'ROLL2': None})
+        self.assertEqual(ExamRoomUpload.objects.count(), 1)
+
+    def test_identical_upload_is_a_no_op_unless_forced(self):
+        self.upload()
+        Student.objects.filter(roll_number='ROLL0').update(exam_hall_number='999')
+
+        response = self.upload()
+        self.assertTrue(response.data['duplicate'])
+        self.assertEqual(self.halls()['ROLL0'], '999')
+        self.assertEqual(ExamRoomUpload.objects.count(), 1)
+
+        response = self.upload(force=True)
+        self.assertFalse(response.data['duplicate'])
+        self.assertEqual(response.data['changed_count'], 1)
+        self.assertEqual(self.halls()['ROLL0'], '101')
+
+    def test_upload_queues_emails_for_moved_students(self):
+        response = self.upload(send_emails=True)
+
+        job = EmailJob.objects.get(id=response.data['email_job']['id'])
+        self.assertEqual(
+            set(job.recipients.values_list('roll_number', flat=True)), {'ROLL0', 'ROLL1'}
+        )
+
+    def test_preview_then_commit(self):
+        response = self.upload(preview=True)
+
+        self.assertTrue(response.data['preview'])
+        self.assertEqual(response.data['added_count'], 2)
+        self.assertEqual(self.halls()['ROLL0'], None)
+        self.assertFalse(ExamRoomUpload.objects.exists())
+
+        token = response.data['token']
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='other'))
+        self.assertEqual(other.post('/api/students/upload-rooms/commit/', {'token': token}).status_code, 404)
+
+        response = self.client.post('/api/students/upload-rooms/commit/', {'token': token, 'send_emails': False})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.halls(), {'ROLL0': '101', 'ROLL1': '102', 'ROLL2': None})
+        self.assertEqual(ExamRoomUpload.objects.count(), 1)
+
+        # A token is single use
+        response = self.client.post('/api/students/upload-rooms/commit/', {'token': token})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,303 @@
+# students/uploads.py
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files import File
+from django.db import transaction
+from .models import Student
+from .statistics import refresh_student_stats
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+import django
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import secrets
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+SHEET_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+def upload_source(file):
+    """Path of an upload spooled to disk, or the file object itself if it only lives in memory"""
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+    return file
+
+
+def file_content_hash(file):
+    """SHA-256 of an uploaded file, read in chunks and rewound afterwards"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class ExamRoomApplier:
+    """Applies cleaned exam room records to students in bulk.
+
+    Each chunk resolves its roll numbers with one IN lookup, finds the unknown
+    ones by set difference and writes the new halls with bulk_update inside its
+    own short transaction, so the SQLite write lock is never held for a whole
+    file. A failure part way through leaves earlier chunks applied.
+
+    Only students whose hall actually differs are written: they are counted
+    as added (no hall before) or changed, everyone else as unchanged, and
+    only the written students end up in updated_ids for re-notification.
+
+    Counts are always exact; with `max_reported` set, only that many unknown
+    roll numbers and row errors are kept for the response, so streaming a
+    huge file does not grow these lists without bound. With `dry_run` the
+    same classification is done without writing anything.
+    """
+
+    def __init__(self, chunk_size=None, max_reported=None, dry_run=False):
+        self.chunk_size = chunk_size or settings.UPLOAD_APPLY_CHUNK_SIZE
+        self.max_reported = max_reported
+        self.dry_run = dry_run
+        self.added_count = 0
+        self.changed_count = 0
+        self.unchanged_count = 0
+        self.updated_ids = {}
+        self.not_found = []
+        self.not_found_count = 0
+        self.errors = []
+        self.conflicts = []
+        self.error_count = 0
+        self.total_processed = 0
+
+    def apply(self, records):
+        """Apply a list of {'roll_number', 'room_number'} records in chunks"""
+        for start in range(0, len(records), self.chunk_size):
+            self.apply_chunk(records[start:start + self.chunk_size])
+        return self
+
+    def apply_chunk(self, records):
+        # Later rows for the same roll number win, as when rows were saved one by one
+        rooms = {record['roll_number']: record['room_number'] for record in records}
+
+        students = list(
+            Student.objects.filter(roll_number__in=list(rooms)).only('id', 'roll_number', 'branch', 'year', 'exam_hall_number')
+        )
+        missing = set(rooms) - {student.roll_number for student in students}
+
+        changed = []
+        for student in students:
+            room_number = rooms[student.roll_number]
+            if student.exam_hall_number == room_number:
+                self.unchanged_count += 1
+                continue
+
+            if student.exam_hall_number:
+                self.changed_count += 1
+            else:
+                self.added_count += 1
+            student.exam_hall_number = room_number
+            changed.append(student)
+
+        if changed and not self.dry_run:
+            with transaction.atomic():
+                Student.objects.bulk_update(changed, ['exam_hall_number'])
+                refresh_student_stats({student.stats_group() for student in changed})
+
+        for record in records:
+            if record['roll_number'] in missing:
+                self.not_found_count += 1
+                self._report(self.not_found, record['roll_number'])
+        self.updated_ids.update(dict.fromkeys(student.id for student in changed))
+        self.total_processed += len(records)
+
+    def add_errors(self, errors):
+        """Count row errors from a chunk that was applied without them"""
+        self.error_count += len(errors)
+        for error in errors:
+            self._report(self.errors, error)
+
+    def _report(self, items, item):
+        if self.max_reported is None or len(items) < self.max_reported:
+            items.append(item)
+
+    def summary(self):
+        """Counts and reported rows for the upload endpoints"""
+        return {
+            'added_count': self.added_count,
+            'changed_count': self.changed_count,
+            'unchanged_count': self.unchanged_count,
+            'updated_count': self.updated_count,
+            'not_found_count': self.not_found_count,
+            'not_found_roll_numbers': self.not_found,
+            'error_count': self.error_count,
+            'file_errors': self.errors,
+            'conflicts': self.conflicts,
+            'total_processed': self.total_processed,
+        }
+
+    @property
+    def updated_count(self):
+        return self.added_count + self.changed_count
+
+    @property
+    def student_ids(self):
+        """Ids of the updated students, each listed once"""
+        return list(self.updated_ids)
+
+
+def save_upload_preview(plan):
+    """Cache a parsed upload for a later commit and return its token"""
+    token = secrets.token_urlsafe(24)
+    caches['uploads'].set(f'upload-preview:{token}', plan, settings.UPLOAD_PREVIEW_TTL)
+    return token
+
+
+def pop_upload_preview(token, user_id):
+    """Return and forget a user's cached upload, or None if it expired or was already committed"""
+    cache = caches['uploads']
+    key = f'upload-preview:{token}'
+    plan = cache.get(key)
+    if plan is None or plan['user_id'] != user_id:
+        return None
+    cache.delete(key)
+    return plan
+
+
+def list_upload_parts(file):
+    """Split an upload into the files and sheets that can be parsed independently.
+
+    Returns (label, member, sheet) tuples, where `member` is the file's path
+    inside a zip archive (None for a plain upload) and `sheet` the worksheet
+    to read (None for CSV files and single-sheet workbooks).
+    """
+    if not file.name.lower().endswith('.zip'):
+        if file.name.lower().endswith('.csv'):
+            return [(file.name, None, None)]
+        return _sheet_parts(file, file.name, None)
+
+    parts = []
+    with zipfile.ZipFile(upload_source(file)) as archive:
+        for info in archive.infolist():
+            base_name = os.path.basename(info.filename)
+            if (info.is_dir() or info.filename.startswith('__MACOSX/') or base_name.startswith('.')
+                    or not base_name.lower().endswith(SHEET_EXTENSIONS)):
+                continue
+
+            if base_name.lower().endswith('.csv'):
+                parts.append((info.filename, info.filename, None))
+            else:
+                # Sheet names are read from the member as a stream, never from its bytes in memory
+                with archive.open(info) as stream:
+                    parts.extend(_sheet_parts(File(stream, name=base_name), info.filename, info.filename))
+    file.seek(0)
+    return parts
+
+
+def _sheet_parts(file, label, member):
+    from .excel import sheet_names
+
+    names = sheet_names(file)
+    if len(names) <= 1:
+        return [(label, member, None)]
+    return [(f'{label} [{sheet}]', member, sheet) for sheet in names]
+
+
+def parse_upload_part(source, file_name, member, sheet):
+    """Read and clean one file or sheet of an upload; runs in a worker process.
+
+    Returns (records, row errors). Problems with the part as a whole, such
+    as missing columns, come back as errors rather than exceptions so they
+    can be reported next to the other parts' results.
+    """
+    from rest_framework import serializers
+    from .excel import read_excel
+    from .serializers import ExamRoomUploadSerializer
+    import pandas as pd
+
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    try:
+        with ExitStack() as stack:
+            # Zip members are opened as streams and spooled uploads by path, so no worker loads a whole file
+            if member is not None:
+                archive = stack.enter_context(zipfile.ZipFile(source))
+                part = File(stack.enter_context(archive.open(member)), name=os.path.basename(member))
+            elif isinstance(source, str):
+                part = File(stack.enter_context(open(source, 'rb')), name=file_name)
+            else:
+                part = File(source, name=file_name)
+
+            serializer = ExamRoomUploadSerializer()
+            if part.name.lower().endswith('.csv'):
+                df = pd.read_csv(part)
+            else:
+                df = read_excel(part, sheet=sheet)
+            return serializer.clean_rows(serializer.map_columns(df))
+
+    except serializers.ValidationError as e:
+        details = e.detail if isinstance(e.detail, list) else [e.detail]
+        return [], [str(detail) for detail in details]
+    except Exception as e:
+        return [], [f"Error processing file: {str(e)}"]
+
+
+def parse_upload_parts(file, parts, workers=None):
+    """Parse the parts of a zip or multi-sheet upload and merge them.
+
+    Returns (records, errors, conflicts). A roll number given different rooms
+    by different parts is a conflict: it is left out of the records and
+    reported with every assignment. Within one part the last row still wins.
+
+    Uploads of at least UPLOAD_PARSE_POOL_MIN_BYTES are parsed in a process
+    pool; smaller ones are parsed serially, since starting the workers would
+    cost more than it saves.
+    """
+    source = upload_source(file)
+    if not isinstance(source, str):
+        file.seek(0)
+        source = file.read()
+
+    workers = min(workers or settings.UPLOAD_PARSE_WORKERS, len(parts))
+    if file.size < settings.UPLOAD_PARSE_POOL_MIN_BYTES:
+        workers = 1
+
+    if workers <= 1:
+        outcomes = [parse_upload_part(source, file.name, member, sheet) for _, member, sheet in parts]
+    else:
+        # Spawned (not forked) workers are safe to start from a threaded server
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup) as executor:
+            futures = [
+                executor.submit(parse_upload_part, source, file.name, member, sheet)
+                for _, member, sheet in parts
+            ]
+            outcomes = [future.result() for future in futures]
+
+    errors = []
+    assignments = {}
+    for (label, _, _), (records, part_errors) in zip(parts, outcomes):
+        errors.extend(f"{label}: {error}" for error in part_errors)
+        rooms = {record['roll_number']: record['room_number'] for record in records}
+        for roll_number, room_number in rooms.items():
+            assignments.setdefault(roll_number, []).append((label, room_number))
+
+    records = []
+    conflicts = []
+    for roll_number, sources in assignments.items():
+        if len({room_number for _, room_number in sources}) > 1:
+            conflicts.append({
+                'roll_number': roll_number,
+                'assignments': [{'source': label, 'room_number': room} for label, room in sources]
+            })
+        else:
+            records.append({'roll_number': roll_number, 'room_number': sources[0][1]})
+
+    logger.info(
+        f"Parsed {len(parts)} upload parts with {workers} worker(s): "
+        f"{len(records)} assignments, {len(errors)} errors, {len(conflicts)} conflicts"
+    )
+    return records, errors, conflicts
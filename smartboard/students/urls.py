@@ -15,8 +15,19 @@ urlpatterns = [
     path('branches/<str:branch_code>/years/<str:year>/students/', views.get_students_by_branch_year, name='get-students-by-branch-year'),
     path('hierarchy/', views.get_hierarchy_overview, name='hierarchy-overview'),
     
+    # Bulk roster import
+    path('import/', views.import_student_roster, name='import-student-roster'),
+    
+    # Exam rooms and hall allocation
+    path('rooms/', views.RoomListCreateView.as_view(), name='room-list-create'),
+    path('rooms/<int:pk>/', views.RoomDetailView.as_view(), name='room-detail'),
+    path('allocate-halls/', views.allocate_exam_halls_view, name='allocate-exam-halls'),
+    path('halls/', views.get_hall_occupancy, name='hall-occupancy'),
+    path('halls/<str:hall_number>/', views.get_hall_roster, name='hall-roster'),
+    
     # Exam room file upload
     path('upload-rooms/', views.upload_exam_room_file, name='upload-exam-rooms'),
+    path('upload-rooms/commit/', views.commit_exam_room_upload, name='commit-exam-room-upload'),
     
     # Email operations
     path('<int:student_id>/send-email/', views.send_individual_email, name='send-individual-email'),
@@ -27,6 +38,11 @@ urlpatterns = [
     path('resend-pending-emails/', views.resend_emails_to_pending_students, name='resend-pending-emails'),
     path('students-by-email-status/', views.get_students_by_email_status, name='students-by-email-status'),
     
+    # Background email jobs
+    path('email-jobs/<int:job_id>/', views.get_email_job_status, name='email-job-status'),
+    path('email-jobs/<int:job_id>/progress/', views.stream_email_job_progress, name='email-job-progress'),
+    path('email-dead-letters/', views.get_email_dead_letters, name='email-dead-letters'),
+    
     # Statistics (enhanced)
     path('statistics/', views.get_statistics, name='statistics'),
 ]
\ No newline at end of file
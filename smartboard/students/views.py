@@ -3,15 +3,32 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import ValidationError
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.db.models import Count, Q
-from .models import Student
+from .models import Student, EmailJob, EmailDeadLetter, ExamRoomUpload, Room
 from .serializers import (
     StudentSerializer, StudentCreateSerializer, 
-    ExamRoomUploadSerializer, BulkEmailSerializer
+    ExamRoomUploadSerializer, BulkEmailSerializer, EmailJobSerializer,
+    EmailDeadLetterSerializer, ExamRoomUploadRecordSerializer, ExamRoomCommitSerializer,
+    StudentRosterImportSerializer, HallAllocationSerializer, RoomSerializer
 )
+from .mailer import send_exam_room_email, record_delivery
+from .email_templates import get_exam_notice
+from .ratelimit import get_email_rate_limiter
+from .jobs import enqueue_email_job, handle_failed_results
+from .allocation import allocate_exam_halls
+from .querysets import filter_students
+from .statistics import get_statistics_data, refresh_student_stats
+from .roster import RosterImporter
+from .uploads import (
+    ExamRoomApplier, file_content_hash, save_upload_preview, pop_upload_preview,
+    list_upload_parts, parse_upload_parts
+)
+import json
 import logging
 import time
 
@@ -28,25 +45,19 @@ class StudentListCreateView(generics.ListCreateAPIView):
         return StudentSerializer
     
     def get_queryset(self):
-        queryset = Student.objects.all()
-        roll_number = self.request.query_params.get('roll_number')
-        branch = self.request.query_params.get('branch')
-        year = self.request.query_params.get('year')
-        hall_number = self.request.query_params.get('hall_number')
-        gmail = self.request.query_params.get('gmail')
-        
-        if roll_number:
-            queryset = queryset.filter(roll_number__icontains=roll_number)
-        if branch:
-            queryset = queryset.filter(branch=branch)
-        if year:
-            queryset = queryset.filter(year=year)
-        if hall_number:
-            queryset = queryset.filter(exam_hall_number=hall_number)
-        if gmail:
-            queryset = queryset.filter(gmail_address__icontains=gmail)
-            
-        return queryset
+        return filter_students(Student.objects.all(), self.request.query_params)
+
+class RoomListCreateView(generics.ListCreateAPIView):
+    """List all exam rooms or create a new one"""
+    queryset = Room.objects.all()
+    serializer_class = RoomSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+class RoomDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update or delete an exam room"""
+    queryset = Room.objects.all()
+    serializer_class = RoomSerializer
+    permission_classes = [permissions.IsAuthenticated]
 
 class StudentDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a student"""
@@ -175,56 +186,110 @@ def get_hierarchy_overview(request):
         'total_branches': len(hierarchy)
     })
 
+def _record_upload(request, applier, content_hash, file_name, file_size, send_emails):
+    """Queue notices for the students an applied upload moved and record the upload"""
+    email_job = None
+    
+    # Queue emails if requested; the email worker sends them in the background
+    if send_emails and applier.updated_ids:
+        email_job = enqueue_email_job(EmailJob.KIND_UPLOAD, applier.student_ids, request.user)
+    
+    upload = ExamRoomUpload.objects.create(
+        content_hash=content_hash,
+        file_name=file_name,
+        file_size=file_size,
+        added_count=applier.added_count,
+        changed_count=applier.changed_count,
+        unchanged_count=applier.unchanged_count,
+        not_found_count=applier.not_found_count,
+        error_count=applier.error_count,
+        email_job=email_job,
+        uploaded_by=request.user if request.user.is_authenticated else None
+    )
+    
+    return Response({
+        'message': 'Exam room file processed successfully',
+        'duplicate': False,
+        'upload': ExamRoomUploadRecordSerializer(upload).data,
+        **applier.summary(),
+        'email_job': EmailJobSerializer(email_job).data if email_job else None
+    }, status=status.HTTP_200_OK)
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def upload_exam_room_file(request):
-    """Upload Excel/CSV file with exam room allocations and send emails"""
+    """Upload Excel/CSV file with exam room allocations and queue emails, or preview it"""
     serializer = ExamRoomUploadSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     file = serializer.validated_data['file']
     send_emails = serializer.validated_data['send_emails']
+    preview = serializer.validated_data['preview']
     
     try:
-        # Process file to get roll numbers and room numbers
-        exam_data = serializer.process_file(file, send_emails)
+        # Re-uploading the last applied file is a no-op unless forced
+        content_hash = file_content_hash(file)
+        last_upload = ExamRoomUpload.objects.first()
+        if (last_upload and last_upload.content_hash == content_hash
+                and not serializer.validated_data['force']):
+            return Response({
+                'message': 'File is identical to the last applied upload; nothing changed',
+                'duplicate': True,
+                'upload': ExamRoomUploadRecordSerializer(last_upload).data
+            }, status=status.HTTP_200_OK)
+        
+        parts = list_upload_parts(file)
+        if file.name.endswith('.zip') or len(parts) > 1:
+            # Zip archives and multi-sheet workbooks are parsed part by part in a process pool
+            records, errors, conflicts = parse_upload_parts(file, parts)
+            if (errors or conflicts) and not serializer.validated_data['stream']:
+                raise ValidationError({
+                    'file_errors': errors,
+                    'conflicts': conflicts,
+                    'valid_records': len(records)
+                })
+            chunks = [(records, errors)]
+            applier = ExamRoomApplier(max_reported=settings.UPLOAD_MAX_REPORTED_ERRORS, dry_run=preview)
+            applier.conflicts = conflicts
+        elif serializer.validated_data['stream']:
+            # Validate and apply chunk by chunk; bad rows are reported, not fatal
+            chunks = serializer.iter_chunks(file)
+            applier = ExamRoomApplier(max_reported=settings.UPLOAD_MAX_REPORTED_ERRORS, dry_run=preview)
+        else:
+            # Process file to get roll numbers and room numbers
+            chunks = [(serializer.process_file(file, send_emails), [])]
+            applier = ExamRoomApplier(dry_run=preview)
         
-        updated_students = []
-        not_found_students = []
-        email_results = []
+        # Resolve and write the assignments in chunked bulk queries
+        records = []
+        for chunk_records, errors in chunks:
+            applier.apply(chunk_records)
+            applier.add_errors(errors)
+            if preview:
+                records.extend(chunk_records)
         
-        with transaction.atomic():
-            for data in exam_data:
-                roll_number = data['roll_number']
-                room_number = data['room_number']
-                
-                try:
-                    # Find student by roll number
-                    student = Student.objects.get(roll_number=roll_number)
-                    
-                    # Update exam hall number
-                    student.exam_hall_number = room_number
-                    student.save(update_fields=['exam_hall_number'])
-                    
-                    updated_students.append(student)
-                    
-                except Student.DoesNotExist:
-                    not_found_students.append(roll_number)
+        if not preview:
+            return _record_upload(request, applier, content_hash, file.name, file.size, send_emails)
         
-        # Send emails if requested
-        if send_emails and updated_students:
-            email_results = send_bulk_emails(updated_students)
+        # Keep the normalised rows so the commit never has to parse the file again
+        token = save_upload_preview({
+            'user_id': request.user.id,
+            'records': records,
+            'errors': applier.errors,
+            'error_count': applier.error_count,
+            'conflicts': applier.conflicts,
+            'content_hash': content_hash,
+            'file_name': file.name,
+            'file_size': file.size
+        })
         
         return Response({
-            'message': 'Exam room file processed successfully',
-            'updated_count': len(updated_students),
-            'not_found_count': len(not_found_students),
-            'not_found_roll_numbers': not_found_students,
-            'total_processed': len(exam_data),
-            'emails_sent': len([r for r in email_results if r['success']]) if send_emails else 0,
-            'email_failures': len([r for r in email_results if not r['success']]) if send_emails else 0,
-            'email_results': email_results if send_emails else []
+            'message': 'Exam room file previewed; nothing has been changed yet',
+            'preview': True,
+            'token': token,
+            'expires_in': settings.UPLOAD_PREVIEW_TTL,
+            **applier.summary()
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -234,6 +299,170 @@ def upload_exam_room_file(request):
             'detail': str(e)
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def commit_exam_room_upload(request):
+    """Apply a previewed exam room upload from its token and queue emails"""
+    serializer = ExamRoomCommitSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    plan = pop_upload_preview(serializer.validated_data['token'], request.user.id)
+    if plan is None:
+        return Response({
+            'error': 'Upload preview not found or expired; upload the file again'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    # Changes are worked out again against current halls, so edits since the preview are respected
+    applier = ExamRoomApplier(max_reported=settings.UPLOAD_MAX_REPORTED_ERRORS).apply(plan['records'])
+    applier.errors = plan['errors']
+    applier.error_count = plan['error_count']
+    applier.conflicts = plan['conflicts']
+    
+    return _record_upload(
+        request, applier, plan['content_hash'], plan['file_name'], plan['file_size'],
+        serializer.validated_data['send_emails']
+    )
+
+# Fields returned for each student in a hall roster
+HALL_ROSTER_FIELDS = ('roll_number', 'name', 'branch', 'year', 'email_sent')
+
+def _assigned_students():
+    return Student.objects.filter(exam_hall_number__isnull=False).exclude(exam_hall_number='')
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_hall_occupancy(request):
+    """Get per-hall student counts (and optionally rosters) for every active room and occupied hall"""
+    # One grouped query over the exam_hall_number index for every occupied hall
+    counts = {
+        hall['exam_hall_number']: hall
+        for hall in _assigned_students().values('exam_hall_number').annotate(
+            student_count=Count('id'),
+            emails_sent=Count('id', filter=Q(email_sent=True))
+        ).order_by()
+    }
+    
+    # Active rooms are listed even while empty; halls outside the room list keep showing up by their counts
+    rooms = {number: (capacity, is_active) for number, capacity, is_active in
+             Room.objects.values_list('number', 'capacity', 'is_active')}
+    hall_numbers = sorted(set(counts) | {number for number, (_, is_active) in rooms.items() if is_active})
+    
+    include_students = request.query_params.get('include_students', '').lower() in ('1', 'true', 'yes')
+    rosters = {}
+    if include_students:
+        # One ordered scan for all rosters instead of one query per hall
+        for row in _assigned_students().order_by('exam_hall_number', 'branch', 'year', 'roll_number').values(
+                'exam_hall_number', *HALL_ROSTER_FIELDS):
+            rosters.setdefault(row.pop('exam_hall_number'), []).append(row)
+    
+    hall_data = []
+    for number in hall_numbers:
+        hall = counts.get(number, {'student_count': 0, 'emails_sent': 0})
+        capacity = rooms[number][0] if number in rooms else None
+        hall_info = {
+            'hall_number': number,
+            'student_count': hall['student_count'],
+            'emails_sent': hall['emails_sent'],
+            'capacity': capacity,
+            'free_seats': capacity - hall['student_count'] if capacity is not None else None
+        }
+        if include_students:
+            hall_info['students'] = rosters.get(number, [])
+        hall_data.append(hall_info)
+    
+    return Response({
+        'halls': hall_data,
+        'total_halls': len(hall_data),
+        'total_students': sum(hall['student_count'] for hall in counts.values())
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_hall_roster(request, hall_number):
+    """Get the compact roster of students seated in one exam hall"""
+    students = list(
+        Student.objects.filter(exam_hall_number=hall_number).order_by(
+            'branch', 'year', 'roll_number'
+        ).values(*HALL_ROSTER_FIELDS)
+    )
+    room = Room.objects.filter(number=hall_number).values('capacity').first()
+    
+    return Response({
+        'hall_number': hall_number,
+        'capacity': room['capacity'] if room else None,
+        'student_count': len(students),
+        'students': students
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def allocate_exam_halls_view(request):
+    """Assign exam halls to the filtered students, filling rooms to capacity"""
+    serializer = HallAllocationSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    options = serializer.validated_data
+    students = filter_students(Student.objects.all(), options)
+    
+    rooms = Room.objects.filter(is_active=True)
+    if options.get('rooms'):
+        rooms = Room.objects.filter(number__in=options['rooms'])
+    
+    try:
+        summary, changed_ids = allocate_exam_halls(
+            students, rooms,
+            interleave=options['interleave_branches'],
+            dry_run=options['dry_run']
+        )
+    except ValueError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    email_job = None
+    if options['send_emails'] and changed_ids and not options['dry_run']:
+        email_job = enqueue_email_job(EmailJob.KIND_ALLOCATION, changed_ids, request.user)
+    
+    return Response({
+        'message': 'Exam halls previewed' if options['dry_run'] else 'Exam halls allocated',
+        'dry_run': options['dry_run'],
+        **summary,
+        'email_job': EmailJobSerializer(email_job).data if email_job else None
+    }, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def import_student_roster(request):
+    """Create or update students in bulk from a CSV/Excel roster"""
+    serializer = StudentRosterImportSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        records, errors, fields = serializer.process_file(serializer.validated_data['file'])
+        
+        # Valid rows are imported even if others failed validation
+        importer = RosterImporter(fields).apply(records)
+        
+        return Response({
+            'message': 'Student roster imported',
+            'created_count': importer.created_count,
+            'updated_count': importer.updated_count,
+            'unchanged_count': importer.unchanged_count,
+            'error_count': len(errors),
+            'errors': errors[:settings.UPLOAD_MAX_REPORTED_ERRORS],
+            'total_processed': len(records)
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error importing student roster: {str(e)}")
+        return Response({
+            'error': 'Failed to import roster',
+            'detail': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def send_individual_email(request, student_id):
@@ -253,16 +482,25 @@ def send_individual_email(request, student_id):
                 'error': 'Student does not have an exam hall number assigned'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        result = send_exam_room_email(student)
+        # Explicit individual sends always go out, but are still recorded in the ledger
+        notice = get_exam_notice()
+        result = send_exam_room_email(student, notice=notice)
         
         if result['success']:
+            Student.objects.filter(id=student.id).update(email_sent=True)
+            refresh_student_stats({student.stats_group()})
             student.email_sent = True
-            student.save()
+            record_delivery(student, notice.content_hash(student))
+            retry_job = None
+        else:
+            # Transient failures are retried in the background, permanent ones dead-lettered
+            retry_job = handle_failed_results([result], user=request.user)
             
         return Response({
             'message': f'Email sending {"successful" if result["success"] else "failed"}',
             'student': StudentSerializer(student).data,
-            'email_result': result
+            'email_result': result,
+            'retry_job': EmailJobSerializer(retry_job).data if retry_job else None
         }, status=status.HTTP_200_OK if result['success'] else status.HTTP_400_BAD_REQUEST)
         
     except Student.DoesNotExist:
@@ -273,7 +511,7 @@ def send_individual_email(request, student_id):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def send_bulk_emails_view(request):
-    """Send emails to multiple students' Gmail addresses"""
+    """Queue emails to multiple students' Gmail addresses"""
     serializer = BulkEmailSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -290,124 +528,14 @@ def send_bulk_emails_view(request):
         exam_hall_number=''
     )
     
-    email_results = send_bulk_emails(valid_students)
+    email_job = enqueue_email_job(EmailJob.KIND_BULK, valid_students, request.user)
     
     return Response({
-        'message': 'Bulk email sending completed',
-        'total_students': len(students),
-        'valid_students': len(valid_students),
-        'emails_sent': len([r for r in email_results if r['success']]),
-        'email_failures': len([r for r in email_results if not r['success']]),
-        'results': email_results
-    }, status=status.HTTP_200_OK)
-
-def send_exam_room_email(student):
-    """Send exam room allocation email to student's Gmail"""
-    try:
-        if not student.gmail_address:
-            return {
-                'success': False,
-                'student_id': student.id,
-                'roll_number': student.roll_number,
-                'email': '',
-                'error': 'No Gmail address found'
-            }
-        
-        if not student.exam_hall_number:
-            return {
-                'success': False,
-                'student_id': student.id,
-                'roll_number': student.roll_number,
-                'email': student.gmail_address,
-                'error': 'No exam hall number assigned'
-            }
-        
-        subject = f'Exam Room Allocation - {student.roll_number} | MITS'
-        
-        # Enhanced email template
-        message = f"""
-Dear {student.name},
-
-Your exam room has been allocated for the upcoming examination.
-
-📚 STUDENT DETAILS:
-━━━━━━━━━━━━━━━━━━━━━
-👤 Name: {student.name}
-🎓 Roll Number: {student.roll_number}
-🏛️ Branch: {student.get_branch_display()}
-📅 Year: {student.get_year_display()}
-🏢 Exam Hall Number: {student.exam_hall_number}
-📧 Contact Email: {student.gmail_address}
-
-⚠️ IMPORTANT INSTRUCTIONS:
-━━━━━━━━━━━━━━━━━━━━━━━━
-• Please arrive at the exam hall at least 30 minutes before the scheduled exam time
-• Bring your valid student ID card and hall ticket
-• Mobile phones and electronic devices are strictly prohibited in the exam hall
-• Reach the venue early to avoid any last-minute rush
-
-📍 Exam Hall Location: Hall Number {student.exam_hall_number}
-
-For any queries, please contact the examination cell.
-
-Best regards,
-MITS Examination Cell
-Madanapalle Institute of Technology & Science
-
----
-This is an automated message. Please do not reply to this email.
-        """.strip()
-        
-        # Send email using Gmail SMTP
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[student.gmail_address],
-            fail_silently=False,
-        )
-        
-        logger.info(f"Email sent successfully to {student.roll_number} at {student.gmail_address}")
-        
-        return {
-            'success': True,
-            'student_id': student.id,
-            'roll_number': student.roll_number,
-            'email': student.gmail_address,
-            'message': 'Email sent successfully to Gmail'
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to send email to {student.roll_number} at {student.gmail_address}: {str(e)}")
-        return {
-            'success': False,
-            'student_id': student.id,
-            'roll_number': student.roll_number,
-            'email': student.gmail_address,
-            'error': str(e)
-        }
-
-def send_bulk_emails(students):
-    """Send emails to multiple students' Gmail addresses with rate limiting"""
-    results = []
-    successful_count = 0
-    
-    for i, student in enumerate(students):
-        # Rate limiting: add delay every 10 emails to avoid Gmail rate limits
-        if i > 0 and i % 10 == 0:
-            time.sleep(2)  # 2 second delay every 10 emails
-        
-        result = send_exam_room_email(student)
-        results.append(result)
-        
-        # Update email_sent status
-        if result['success']:
-            student.email_sent = True
-            student.save(update_fields=['email_sent'])
-            successful_count += 1
-    
-    logger.info(f"Bulk email completed: {successful_count}/{len(students)} emails sent successfully")
-    return results
+        'message': 'Bulk email sending queued',
+        'total_students': students.count(),
+        'valid_students': email_job.total_count,
+        'job': EmailJobSerializer(email_job).data
+    }, status=status.HTTP_202_ACCEPTED)
 
 # Enhanced students/views.py - Add this updated get_statistics function
 
@@ -415,183 +543,14 @@ def send_bulk_emails(students):
 @permission_classes([permissions.IsAuthenticated])
 def get_statistics(request):
     """Get system statistics with hierarchical breakdown and pending email details"""
-    total_students = Student.objects.count()
-    emails_sent = Student.objects.filter(email_sent=True).count()
-    students_with_gmail = Student.objects.exclude(gmail_address='').count()
-    students_with_room = Student.objects.exclude(exam_hall_number='').count()
-    
-    # Students ready for email but not sent yet (have both gmail and room number)
-    students_ready_for_email = Student.objects.filter(
-        gmail_address__isnull=False,
-        exam_hall_number__isnull=False,
-        email_sent=False
-    ).exclude(
-        gmail_address='',
-        exam_hall_number=''
-    )
-    
-    # Students who can't receive emails (missing gmail or room)
-    students_missing_gmail = Student.objects.filter(
-        Q(gmail_address__isnull=True) | Q(gmail_address='')
-    )
-    
-    students_missing_room = Student.objects.filter(
-        Q(exam_hall_number__isnull=True) | Q(exam_hall_number='')
-    )
-    
-    # Branch-wise statistics with detailed breakdown
-    branches_stats = {}
-    for branch_code, branch_name in Student.BRANCH_CHOICES:
-        branch_students = Student.objects.filter(branch=branch_code)
-        count = branch_students.count()
-        
-        if count > 0:
-            # Branch level statistics
-            branch_emails_sent = branch_students.filter(email_sent=True).count()
-            branch_with_room = branch_students.exclude(exam_hall_number='').count()
-            branch_with_gmail = branch_students.exclude(gmail_address='').count()
-            
-            # Students ready for email (have both gmail and room but email not sent)
-            branch_ready_for_email = branch_students.filter(
-                gmail_address__isnull=False,
-                exam_hall_number__isnull=False,
-                email_sent=False
-            ).exclude(
-                gmail_address='',
-                exam_hall_number=''
-            )
-            
-            # Students missing requirements
-            branch_missing_gmail = branch_students.filter(
-                Q(gmail_address__isnull=True) | Q(gmail_address='')
-            )
-            
-            branch_missing_room = branch_students.filter(
-                Q(exam_hall_number__isnull=True) | Q(exam_hall_number='')
-            )
-            
-            branches_stats[branch_code] = {
-                'name': branch_name,
-                'count': count,
-                'emails_sent': branch_emails_sent,
-                'with_room': branch_with_room,
-                'with_gmail': branch_with_gmail,
-                'ready_for_email': branch_ready_for_email.count(),
-                'missing_gmail': branch_missing_gmail.count(),
-                'missing_room': branch_missing_room.count(),
-                'pending_email_students': [
-                    {
-                        'id': student.id,
-                        'roll_number': student.roll_number,
-                        'name': student.name,
-                        'gmail_address': student.gmail_address,
-                        'exam_hall_number': student.exam_hall_number,
-                        'year': student.year
-                    }
-                    for student in branch_ready_for_email
-                ],
-                'years': {}
-            }
-            
-            # Year-wise breakdown for each branch
-            for year_code, year_name in Student.YEAR_CHOICES:
-                year_students = branch_students.filter(year=year_code)
-                year_count = year_students.count()
-                
-                if year_count > 0:
-                    year_emails_sent = year_students.filter(email_sent=True).count()
-                    year_with_room = year_students.exclude(exam_hall_number='').count()
-                    year_with_gmail = year_students.exclude(gmail_address='').count()
-                    
-                    # Year level ready for email
-                    year_ready_for_email = year_students.filter(
-                        gmail_address__isnull=False,
-                        exam_hall_number__isnull=False,
-                        email_sent=False
-                    ).exclude(
-                        gmail_address='',
-                        exam_hall_number=''
-                    )
-                    
-                    # Year level missing requirements
-                    year_missing_gmail = year_students.filter(
-                        Q(gmail_address__isnull=True) | Q(gmail_address='')
-                    )
-                    
-                    year_missing_room = year_students.filter(
-                        Q(exam_hall_number__isnull=True) | Q(exam_hall_number='')
-                    )
-                    
-                    branches_stats[branch_code]['years'][year_code] = {
-                        'name': year_name,
-                        'count': year_count,
-                        'emails_sent': year_emails_sent,
-                        'emails_pending': year_count - year_emails_sent,
-                        'with_room': year_with_room,
-                        'with_gmail': year_with_gmail,
-                        'ready_for_email': year_ready_for_email.count(),
-                        'missing_gmail': year_missing_gmail.count(),
-                        'missing_room': year_missing_room.count(),
-                        'pending_email_students': [
-                            {
-                                'id': student.id,
-                                'roll_number': student.roll_number,
-                                'name': student.name,
-                                'gmail_address': student.gmail_address,
-                                'exam_hall_number': student.exam_hall_number
-                            }
-                            for student in year_ready_for_email
-                        ],
-                        'missing_gmail_students': [
-                            {
-                                'id': student.id,
-                                'roll_number': student.roll_number,
-                                'name': student.name,
-                                'exam_hall_number': student.exam_hall_number or 'Not assigned'
-                            }
-                            for student in year_missing_gmail
-                        ],
-                        'missing_room_students': [
-                            {
-                                'id': student.id,
-                                'roll_number': student.roll_number,
-                                'name': student.name,
-                                'gmail_address': student.gmail_address or 'Not provided'
-                            }
-                            for student in year_missing_room
-                        ]
-                    }
-    
-    return Response({
-        'total_students': total_students,
-        'students_with_gmail': students_with_gmail,
-        'students_with_room': students_with_room,
-        'emails_sent': emails_sent,
-        'emails_pending': total_students - emails_sent,
-        'students_ready_for_email': students_ready_for_email.count(),
-        'students_missing_gmail': students_missing_gmail.count(),
-        'students_missing_room': students_missing_room.count(),
-        'branches_statistics': branches_stats,
-        'global_pending_email_students': [
-            {
-                'id': student.id,
-                'roll_number': student.roll_number,
-                'name': student.name,
-                'branch': student.branch,
-                'year': student.year,
-                'gmail_address': student.gmail_address,
-                'exam_hall_number': student.exam_hall_number
-            }
-            for student in students_ready_for_email
-        ]
-    })
+    return Response(get_statistics_data())
 
 
 # Add this new endpoint for resending emails to specific students
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def resend_emails_to_pending_students(request):
-    """Resend emails to students who have room numbers but haven't received emails"""
+    """Queue emails for students who have room numbers but haven't received emails"""
     # Get filters from request
     branch = request.data.get('branch')
     year = request.data.get('year')
@@ -620,19 +579,14 @@ def resend_emails_to_pending_students(request):
             'error': 'No students found matching the criteria'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Send emails
-    email_results = send_bulk_emails(queryset)
-    
-    successful_emails = len([r for r in email_results if r['success']])
-    failed_emails = len([r for r in email_results if not r['success']])
+    # Queue emails
+    email_job = enqueue_email_job(EmailJob.KIND_RESEND, queryset, request.user)
     
     return Response({
-        'message': 'Resend email operation completed',
-        'total_students': queryset.count(),
-        'emails_sent': successful_emails,
-        'email_failures': failed_emails,
-        'results': email_results
-    })
+        'message': 'Resend email operation queued',
+        'total_students': email_job.total_count,
+        'job': EmailJobSerializer(email_job).data
+    }, status=status.HTTP_202_ACCEPTED)
 
 
 # Add this endpoint to get students by specific criteria for targeted email sending
@@ -688,12 +642,152 @@ def get_students_by_email_status(request):
         'total_students': len(serializer.data)
     })
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_email_job_status(request, job_id):
+    """Get the status and results of a queued email job"""
+    try:
+        email_job = EmailJob.objects.get(id=job_id)
+    except EmailJob.DoesNotExist:
+        return Response({
+            'error': 'Email job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'job': EmailJobSerializer(email_job).data
+    }, status=status.HTTP_200_OK)
+
+def _email_job_progress_lines(job_id, interval):
+    """Yield one NDJSON line per poll of the job row, then a final summary or a timeout"""
+    last_processed = None
+    last_polled = None
+    deadline = time.monotonic() + settings.EMAIL_PROGRESS_STREAM_MAX_SECONDS
+    
+    while True:
+        email_job = EmailJob.objects.get(id=job_id)
+        polled = time.monotonic()
+        processed = email_job.sent_count + email_job.failed_count
+        
+        if email_job.is_finished:
+            duration = None
+            if email_job.started_at and email_job.finished_at:
+                duration = (email_job.finished_at - email_job.started_at).total_seconds()
+            
+            yield json.dumps({
+                'event': 'complete',
+                'job_id': email_job.id,
+                'status': email_job.status,
+                'total': email_job.total_count,
+                'sent': email_job.sent_count,
+                'failed': email_job.failed_count,
+                'duration_seconds': duration,
+                'error': email_job.error
+            }) + '\n'
+            return
+        
+        if email_job.started_at is None:
+            # No worker has claimed the job yet (none running, or run_after still in the future)
+            yield json.dumps({
+                'event': 'queued',
+                'job_id': email_job.id,
+                'status': email_job.status,
+                'total': email_job.total_count,
+                'run_after': email_job.run_after.isoformat() if email_job.run_after else None
+            }) + '\n'
+        else:
+            # Rate since the previous poll; the first line uses the average since the job started
+            if last_polled is not None and polled > last_polled:
+                rate = (processed - last_processed) / (polled - last_polled)
+            else:
+                elapsed = (timezone.now() - email_job.started_at).total_seconds()
+                rate = processed / elapsed if elapsed > 0 else 0.0
+            
+            yield json.dumps({
+                'event': 'progress',
+                'job_id': email_job.id,
+                'status': email_job.status,
+                'sent': email_job.sent_count,
+                'failed': email_job.failed_count,
+                'remaining': max(email_job.total_count - processed, 0),
+                'rate': round(rate, 2)
+            }) + '\n'
+        
+        # Never hold the worker past the deadline; the client reconnects to keep following the job
+        if time.monotonic() + interval > deadline:
+            yield json.dumps({
+                'event': 'timeout',
+                'job_id': email_job.id,
+                'status': email_job.status,
+                'reconnect': True
+            }) + '\n'
+            return
+        
+        last_processed = processed
+        last_polled = polled
+        time.sleep(interval)
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def stream_email_job_progress(request, job_id):
+    """Stream email job progress as newline-delimited JSON until the job finishes or the stream times out"""
+    if not EmailJob.objects.filter(id=job_id).exists():
+        return Response({
+            'error': 'Email job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        interval = float(request.query_params.get('interval', 1))
+    except ValueError:
+        interval = 1.0
+    interval = min(max(interval, 0.2), 10.0)
+    
+    response = StreamingHttpResponse(
+        _email_job_progress_lines(job_id, interval),
+        content_type='application/x-ndjson'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_email_dead_letters(request):
+    """List emails that failed permanently or ran out of retries"""
+    error_class = request.query_params.get('error_class')
+    branch = request.query_params.get('branch')
+    year = request.query_params.get('year')
+    roll_number = request.query_params.get('roll_number')
+    
+    queryset = EmailDeadLetter.objects.select_related('student')
+    
+    if error_class:
+        queryset = queryset.filter(error_class=error_class)
+    if branch:
+        queryset = queryset.filter(student__branch=branch)
+    if year:
+        queryset = queryset.filter(student__year=year)
+    if roll_number:
+        queryset = queryset.filter(student__roll_number__icontains=roll_number)
+    
+    error_classes = queryset.values('error_class').annotate(
+        count=Count('id')
+    ).order_by('error_class')
+    
+    serializer = EmailDeadLetterSerializer(queryset, many=True)
+    
+    return Response({
+        'dead_letters': serializer.data,
+        'error_classes': {row['error_class']: row['count'] for row in error_classes},
+        'total_dead_letters': len(serializer.data)
+    })
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def test_email_configuration(request):
     """Test Gmail SMTP configuration"""
     try:
         # Send test email
+        get_email_rate_limiter().acquire()
         send_mail(
             subject='Test Email - MITS Exam System',
             message='This is a test email to verify Gmail SMTP configuration.',